@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Fire a mixed upload/list/get/delete workload at a deployed (or local) API.
+
+Run it once against a stack deployed with HandlerMode=split and once with
+HandlerMode=router to compare latency and, with --stack-name, the number of
+cold starts Lambda reported while the workload ran:
+
+    python scripts/load_test.py --url "$(./scripts/get_api_url.sh)" --stack-name image-service-stack
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _request(method, url, body=None, headers=None):
+    req = urllib.request.Request(url, data=body, method=method, headers=headers or {})
+    opener = urllib.request.build_opener(_NoRedirect)
+    try:
+        with opener.open(req, timeout=30) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _multipart(file_bytes, filename, fields):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'.encode() + file_bytes + b'\r\n'
+    )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Workload:
+    def __init__(self, base_url, image_bytes):
+        self.base_url = base_url.rstrip('/')
+        self.image_bytes = image_bytes
+        self.image_ids = []
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def _timed(self, name, method, url, body=None, headers=None):
+        start = time.perf_counter()
+        status, payload = _request(method, url, body, headers)
+        self.timings[name].append((time.perf_counter() - start) * 1000)
+        if status >= 400:
+            self.errors[name] += 1
+        return status, payload
+
+    def upload(self):
+        body, content_type = _multipart(self.image_bytes, 'load.jpg', {'tags': 'load,test'})
+        status, payload = self._timed('upload', 'POST', f'{self.base_url}/images', body, {'Content-Type': content_type})
+        if status == 201:
+            with self.lock:
+                self.image_ids.append(json.loads(payload)['imageId'])
+
+    def list(self):
+        self._timed('list', 'GET', f'{self.base_url}/images')
+
+    def get(self):
+        with self.lock:
+            image_id = random.choice(self.image_ids) if self.image_ids else None
+        if image_id:
+            self._timed('get', 'GET', f'{self.base_url}/images/{image_id}')
+
+    def delete(self):
+        with self.lock:
+            image_id = self.image_ids.pop() if len(self.image_ids) > 1 else None
+        if image_id:
+            self._timed('delete', 'DELETE', f'{self.base_url}/images/{image_id}')
+
+    def step(self):
+        op = random.choices([self.upload, self.list, self.get, self.delete], weights=[2, 4, 8, 1])[0]
+        op()
+
+    def report(self):
+        print(f"{'route':<8} {'n':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for name, values in sorted(self.timings.items()):
+            values = sorted(values)
+            q = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+            print(f"{name:<8} {len(values):>6} {self.errors[name]:>5} {q[49]:>9.1f} {q[94]:>9.1f} {q[98]:>9.1f} {values[-1]:>9.1f}")
+
+
+def count_cold_starts(stack_name, since_ms, profile=None):
+    """Count Lambda REPORT lines carrying an 'Init Duration' for the stack's functions."""
+    import boto3
+    session = boto3.Session(profile_name=profile) if profile else boto3.Session()
+    logs = session.client('logs')
+    prefix = f'/aws/lambda/{stack_name}-'
+    counts = {}
+    for page in logs.get_paginator('describe_log_groups').paginate(logGroupNamePrefix=prefix):
+        for group in page['logGroups']:
+            name = group['logGroupName'][len(prefix):]
+            events = logs.get_paginator('filter_log_events').paginate(
+                logGroupName=group['logGroupName'], startTime=since_ms, filterPattern='"Init Duration"'
+            )
+            counts[name] = sum(len(p['events']) for p in events)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', required=True, help='API base URL, without the trailing /images')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--image', default='imageFiles/image1.jpg')
+    parser.add_argument('--stack-name', help='Report cold starts from this stack\'s Lambda logs')
+    parser.add_argument('--profile', help='AWS profile for the CloudWatch Logs lookup (e.g. localstack)')
+    args = parser.parse_args()
+
+    with open(args.image, 'rb') as f:
+        workload = Workload(args.url, f.read())
+
+    started_ms = int(time.time() * 1000)
+    workload.upload()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in pool.map(lambda _: workload.step(), range(args.requests)):
+            pass
+    workload.report()
+
+    if args.stack_name:
+        # CloudWatch Logs ingestion lags a few seconds behind the invocations.
+        time.sleep(10)
+        cold_starts = count_cold_starts(args.stack_name, started_ms, args.profile)
+        print(f"\ncold starts: {sum(cold_starts.values())}")
+        for name, count in sorted(cold_starts.items()):
+            print(f"  {name:<28} {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,9 @@ class Config:
     S3_ENDPOINT_URL = None
     DYNAMODB_ENDPOINT_URL = None
     BOTO3_CREDENTIALS = {}
+    CURSOR_SECRET = os.environ.get("CURSOR_SECRET")
+    CURSOR_TTL_SECONDS = int(os.environ.get("CURSOR_TTL_SECONDS", "0"))
+    SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.environ.get("SINGLE_FLIGHT_TIMEOUT_SECONDS", "5"))
 
 
 class LocalConfig(Config):
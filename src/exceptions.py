@@ -15,4 +15,20 @@ class S3Error(ImageServiceException):
 
 
 class DatabaseError(ImageServiceException):
-    pass
\ No newline at end of file
+    pass
+
+
+class RangeNotSatisfiableError(InvalidRequestError):
+    pass
+
+
+class InvalidCursorError(InvalidRequestError):
+    pass
+
+
+class BatchWriteError(DatabaseError):
+    """A batch write that failed part way; `written` lists the keys already committed."""
+
+    def __init__(self, message, written=()):
+        super().__init__(message)
+        self.written = list(written)
@@ -0,0 +1,36 @@
+import logging
+import os
+import time
+from src.handlers.decorators import inject_services
+from src.utils.profiling import profiled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Rows hashed this long before the scan started are queried again by the
+# similarity index, covering clock skew between the job and process_image.
+SNAPSHOT_OVERLAP_SECONDS = int(os.environ.get("SNAPSHOT_OVERLAP_SECONDS", "60"))
+
+
+@profiled
+@inject_services(s3=True, dynamodb=True)
+def handler(event, context, s3_service=None, dynamodb_service=None):
+    """Scheduled job: writes every perceptual hash to a packed S3 snapshot.
+
+    search_similar loads the snapshot when a container starts and Queries
+    HashIndex only for rows hashed since the snapshot's watermark. Rows hashed
+    while the scan runs may be missed by it, so the watermark is the scan's
+    start time rather than its end.
+    """
+    # Imported lazily like search_similar's index, so numpy only loads where it is used.
+    from src.utils.hash_snapshot import SNAPSHOT_KEY, pack_snapshot
+
+    watermark = int(time.time()) - SNAPSHOT_OVERLAP_SECONDS
+    ids, hashes = [], []
+    for item in dynamodb_service.scan_hashes():
+        ids.append(item['imageId'])
+        hashes.append(int(item['phash'], 16))
+
+    s3_service.upload_file(pack_snapshot(ids, hashes, watermark), SNAPSHOT_KEY, 'application/octet-stream')
+    logger.info(f"Wrote similarity snapshot with {len(ids)} hashes, watermark {watermark}")
+    return {"hashes": len(ids), "watermark": watermark}
@@ -0,0 +1,114 @@
+import uuid
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from src.handlers.common import create_response, build_metadata, owner_from_event, store_upload
+from src.utils.multipart_parser import parse_multipart
+from src.exceptions import InvalidRequestError, S3Error, DatabaseError, BatchWriteError
+from src.handlers.decorators import inject_services
+from src.models.image_metadata import extra_key
+from src.utils.profiling import profiled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MAX_BULK_FILES = int(os.environ.get("MAX_BULK_FILES", "50"))
+BULK_UPLOAD_WORKERS = int(os.environ.get("BULK_UPLOAD_WORKERS", "8"))
+
+
+def file_fields(form_data, part_name):
+    """Form fields for one file part: plain fields apply to every file, and
+    '<part name>.<field>' fields apply only to files sent under that part name."""
+    fields = {k: v for k, v in form_data.items() if '.' not in k}
+    prefix = f"{part_name}."
+    fields.update({k[len(prefix):]: v for k, v in form_data.items() if k.startswith(prefix)})
+    return fields
+
+
+def _remove(s3_service, metadata):
+    keys = [metadata.s3_key] + ([extra_key(metadata.imageId)] if metadata.extra else [])
+    for key in keys:
+        try:
+            s3_service.delete_file(key)
+        except S3Error as e:
+            logger.error(f"Failed to remove orphaned object {key}: {e}")
+
+
+@profiled
+@inject_services(s3=True, dynamodb=True, aggregates=True)
+def handler(event, context, s3_service=None, dynamodb_service=None, aggregates_service=None):
+    try:
+        form_data, files = parse_multipart(event)
+        parts = list(files.items(multi=True))
+
+        if not parts:
+            return create_response(400, {"message": "At least one file part is required."})
+        if len(parts) > MAX_BULK_FILES:
+            return create_response(400, {"message": f"At most {MAX_BULK_FILES} files can be uploaded per request."})
+
+        owner = owner_from_event(event)
+        results, prepared = [], []
+        for part_name, image_file in parts:
+            image_id = str(uuid.uuid4())
+            try:
+                metadata = build_metadata(image_id, f"{image_id}-{image_file.filename}", image_file,
+                                          file_fields(form_data, part_name), owner)
+            except InvalidRequestError as e:
+                results.append({"filename": image_file.filename, "status": "failed", "message": str(e)})
+                continue
+            results.append({"filename": image_file.filename, "status": "uploaded", "imageId": image_id})
+            prepared.append((results[-1], image_file, metadata))
+
+        stored = []
+        if prepared:
+            # boto3 clients are thread-safe, so every worker shares s3_service's client.
+            with ThreadPoolExecutor(max_workers=min(BULK_UPLOAD_WORKERS, len(prepared))) as pool:
+                futures = [pool.submit(store_upload, s3_service, metadata, image_file)
+                           for _, image_file, metadata in prepared]
+            for (result, image_file, metadata), future in zip(prepared, futures):
+                try:
+                    future.result()
+                except S3Error as e:
+                    logger.error(f"Failed to store {image_file.filename}: {e}")
+                    # The extra-fields object is written before the file, so it may have landed.
+                    _remove(s3_service, metadata)
+                    result.update(status="failed", message="A service error occurred.")
+                    del result["imageId"]
+                    continue
+                stored.append(metadata)
+
+        rows = [metadata.to_item() for metadata in stored]
+        if rows:
+            try:
+                dynamodb_service.batch_put_items(rows)
+            except DatabaseError as e:
+                logger.error(f"Failed to write metadata for bulk upload: {e}")
+                # Rows are written in batches of 25, so earlier batches may have
+                # landed; keep those images and undo only the rest.
+                written = {key[0] for key in e.written} if isinstance(e, BatchWriteError) else set()
+                for result, _, metadata in prepared:
+                    if result["status"] == "uploaded" and metadata.imageId not in written:
+                        _remove(s3_service, metadata)
+                        result.update(status="failed", message="A service error occurred.")
+                        del result["imageId"]
+                rows = [row for row in rows if row['imageId'] in written]
+
+        if rows:
+            try:
+                aggregates_service.record_images(rows, 1)
+            except DatabaseError as e:
+                logger.error(f"Failed to update aggregates for bulk upload: {e}")
+
+        if not prepared:
+            return create_response(400, {"message": "No file had valid metadata.", "results": results})
+        if not rows:
+            return create_response(500, {"message": "A service error occurred.", "results": results})
+        status_code = 201 if len(rows) == len(results) else 207
+        return create_response(status_code, {"message": f"Uploaded {len(rows)} of {len(results)} images", "results": results})
+
+    except InvalidRequestError as e:
+        logger.warning(f"Bad request: {e}")
+        return create_response(400, {"message": str(e)})
+    except Exception as e:
+        logger.error(f"Error bulk uploading images: {e}")
+        return create_response(500, {"message": "Internal server error"})
@@ -1,5 +1,8 @@
+import base64
 import json
+import time
 from decimal import Decimal
+from src.models.image_metadata import ImageMetadata, extra_key
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -21,3 +24,52 @@ def create_response(status_code, body, headers=None):
         "headers": headers,
         "body": json.dumps(body, cls=DecimalEncoder) if body is not None else ""
     }
+
+
+def create_binary_response(status_code, chunks, headers):
+    """Lambda proxy response with a base64 body, encoded chunk by chunk."""
+    encoded = []
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        # Only whole 3-byte groups encode without padding, so carry the rest over.
+        cut = len(pending) - len(pending) % 3
+        encoded.append(base64.b64encode(pending[:cut]))
+        pending = pending[cut:]
+    encoded.append(base64.b64encode(pending))
+    return {
+        "statusCode": status_code,
+        "headers": headers,
+        "body": b"".join(encoded).decode("ascii"),
+        "isBase64Encoded": True,
+    }
+
+
+def owner_from_event(event):
+    """The caller's identity from the API Gateway authorizer, or None without one.
+
+    Cognito user pool authorizers put it in claims.sub, Lambda authorizers in principalId.
+    """
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+    return (authorizer.get('claims') or {}).get('sub') or authorizer.get('principalId') or None
+
+
+def build_metadata(image_id, s3_key, image_file, form_fields, owner=None):
+    """Validated metadata for an upload; raises InvalidRequestError for bad form fields."""
+    return ImageMetadata.from_form(
+        image_id, s3_key, image_file.filename, image_file.content_type, form_fields, int(time.time()), owner
+    )
+
+
+def store_upload(s3_service, metadata, image_file):
+    """Store an upload's extra fields (if any) and then the file itself."""
+    if metadata.extra:
+        s3_service.upload_file(metadata.extra_document(), extra_key(metadata.imageId), "application/json")
+    s3_service.upload_file(image_file.read(), metadata.s3_key, image_file.content_type)
+
+
+def with_extra(s3_service, item):
+    """A metadata row with its extra fields from the side object merged back in."""
+    if not item.get('hasExtra'):
+        return item
+    return {**json.loads(s3_service.get_file(extra_key(item['imageId']))), **item}
@@ -1,23 +1,41 @@
+import asyncio
+import inspect
 from functools import wraps
 from src.services.s3_service import S3Service
 from src.services.dynamodb_service import DynamoDBService
+from src.services.aggregates_service import AggregatesService
+from src.services.async_service import AsyncService
 
 _s3_service = None
 _dynamodb_service = None
+_aggregates_service = None
 
 
-def inject_services(s3=False, dynamodb=False):
+def inject_services(s3=False, dynamodb=False, aggregates=False):
+    """Inject the shared services into a handler.
+
+    `async def` handlers get AsyncService wrappers instead and are run with
+    asyncio.run, so the decorated handler is a plain Lambda entry point either way.
+    """
     def decorator(func):
+        is_async = inspect.iscoroutinefunction(func)
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            global _s3_service, _dynamodb_service
+            global _s3_service, _dynamodb_service, _aggregates_service
             if s3 and _s3_service is None: _s3_service = S3Service()
             if dynamodb and _dynamodb_service is None: _dynamodb_service = DynamoDBService()
+            if aggregates and _aggregates_service is None: _aggregates_service = AggregatesService()
 
+            wrap = AsyncService if is_async else (lambda service: service)
             if s3:
-                kwargs['s3_service'] = _s3_service
+                kwargs['s3_service'] = wrap(_s3_service)
             if dynamodb:
-                kwargs['dynamodb_service'] = _dynamodb_service
+                kwargs['dynamodb_service'] = wrap(_dynamodb_service)
+            if aggregates:
+                kwargs['aggregates_service'] = wrap(_aggregates_service)
+            if is_async:
+                return asyncio.run(func(*args, **kwargs))
             return func(*args, **kwargs) # pragma: no cover
         return wrapper
-    return decorator # pragma: no cover
\ No newline at end of file
+    return decorator # pragma: no cover
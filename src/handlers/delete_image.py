@@ -1,19 +1,51 @@
+import asyncio
 import logging
 from src.handlers.common import create_response
 from src.exceptions import ImageNotFoundError, S3Error, DatabaseError
 from src.handlers.decorators import inject_services
+from src.models.image_metadata import extra_key
+from src.utils.profiling import profiled
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-@inject_services(s3=True, dynamodb=True)
-def handler(event, context, s3_service=None, dynamodb_service=None):
+@profiled
+@inject_services(s3=True, dynamodb=True, aggregates=True)
+async def handler(event, context, s3_service=None, dynamodb_service=None, aggregates_service=None):
     try:
         image_id = event['pathParameters']['imageId']
-        metadata = dynamodb_service.get_item(image_id)
-        s3_service.delete_file(metadata['s3_key'])
-        dynamodb_service.delete_item(image_id)
+        metadata = await dynamodb_service.get_item(image_id)
+        # The object and the row are independent, so delete both at once and
+        # wait for each to finish before reporting.
+        deletes = [s3_service.delete_file(metadata['s3_key']), dynamodb_service.delete_item(image_id)]
+        if metadata.get('hasExtra'):
+            deletes.append(s3_service.delete_file(extra_key(image_id)))
+        s3_result, row_result, *extra_result = await asyncio.gather(*deletes, return_exceptions=True)
+        s3_errors = [r for r in (s3_result, *extra_result) if isinstance(r, Exception)]
+        # delete_item fails with ImageNotFoundError when a concurrent or retried
+        # delete removed the row first, so only one request counts the image out.
+        row_deleted = not isinstance(row_result, Exception)
+
+        if row_deleted and s3_errors:
+            # Put the row back so a retry finds the image again; deleting the
+            # objects that did go is a no-op the second time.
+            try:
+                await dynamodb_service.put_item(metadata)
+                row_deleted = False
+            except DatabaseError as e:
+                logger.error(f"Failed to restore metadata for {image_id}; object {metadata['s3_key']} is orphaned: {e}")
+
+        if row_deleted:
+            try:
+                await aggregates_service.record_images([metadata], -1)
+            except DatabaseError as e:
+                logger.error(f"Failed to update aggregates for image {image_id}: {e}")
+
+        for result in (row_result, *s3_errors):
+            if isinstance(result, Exception):
+                raise result
+
         return create_response(200, {"message": "Image deleted successfully"})
 
     except ImageNotFoundError as e:
@@ -1,19 +1,105 @@
 import logging
-from src.handlers.common import create_response
-from src.exceptions import ImageNotFoundError, S3Error, DatabaseError
+import os
+import random
+import re
+import time
+from src.handlers.common import create_response, create_binary_response
+from src.exceptions import ImageNotFoundError, RangeNotSatisfiableError, S3Error, DatabaseError
 from src.handlers.decorators import inject_services
+from src.utils.profiling import profiled
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# 'redirect' answers with a 302 to a presigned URL; 'proxy' returns the bytes
+# itself for clients that cannot follow cross-origin redirects. A request can
+# pick either with ?mode=.
+DOWNLOAD_MODE = os.environ.get("DOWNLOAD_MODE", "redirect")
 
+# API Gateway caps Lambda proxy responses at 6 MB and the body is base64
+# encoded, so anything bigger than this is served by redirect instead.
+PROXY_MAX_BYTES = int(os.environ.get("PROXY_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# Fraction of reads recorded on the metadata row (lastAccessed, readCount) for
+# the tiering job; readCount is scaled up so it still estimates total reads.
+ACCESS_SAMPLE_RATE = float(os.environ.get("ACCESS_SAMPLE_RATE", "0.05"))
+
+_RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """Resolve a single-range 'Range' header to inclusive (start, end) offsets.
+
+    Returns None when the whole object should be served, which is also how
+    unparseable and multi-range headers are treated.
+    """
+    match = _RANGE_PATTERN.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            raise RangeNotSatisfiableError(f"Range '{header}' is empty.")
+    if start >= size:
+        raise RangeNotSatisfiableError(f"Range '{header}' starts beyond the end of the object.")
+    return start, end
+
+
+def record_access(dynamodb_service, image_id):
+    if ACCESS_SAMPLE_RATE <= 0 or random.random() >= ACCESS_SAMPLE_RATE:
+        return
+    try:
+        dynamodb_service.record_access(image_id, round(1 / ACCESS_SAMPLE_RATE), int(time.time()))
+    except (DatabaseError, ImageNotFoundError) as e:
+        logger.warning(f"Failed to record access to image {image_id}: {e}")
+
+
+def _redirect(s3_service, s3_key):
+    return create_response(302, None, headers={"Location": s3_service.get_file_url(s3_key)})
+
+
+def _proxy(event, s3_service, s3_key):
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    size, content_type = s3_service.head_file(s3_key)
+    try:
+        byte_range = parse_range(headers.get('range'), size)
+    except RangeNotSatisfiableError:
+        return create_response(416, None, headers={"Content-Range": f"bytes */{size}", "Accept-Ranges": "bytes"})
+
+    start, end = byte_range or (0, size - 1)
+    if end - start + 1 > PROXY_MAX_BYTES:
+        return _redirect(s3_service, s3_key)
+
+    response_headers = {
+        "Content-Type": content_type,
+        "Accept-Ranges": "bytes",
+        "Access-Control-Allow-Origin": "*",
+    }
+    if size == 0:
+        return create_binary_response(200, [], response_headers)
+    if byte_range:
+        response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    chunks = s3_service.iter_file_range(s3_key, start, end)
+    return create_binary_response(206 if byte_range else 200, chunks, response_headers)
+
+
+@profiled
 @inject_services(s3=True, dynamodb=True)
 def handler(event, context, s3_service=None, dynamodb_service=None):
     try:
         image_id = event['pathParameters']['imageId']
         metadata = dynamodb_service.get_item(image_id)
-        download_url = s3_service.get_file_url(metadata['s3_key'])
-        return create_response(302, None, headers={"Location": download_url})
+        record_access(dynamodb_service, image_id)
+        mode = (event.get('queryStringParameters') or {}).get('mode', DOWNLOAD_MODE)
+        if mode == 'proxy':
+            return _proxy(event, s3_service, metadata['s3_key'])
+        return _redirect(s3_service, metadata['s3_key'])
 
     except ImageNotFoundError as e:
         logger.warning(f"Image not found for ID '{image_id}': {e}")
@@ -0,0 +1,49 @@
+import logging
+from src.handlers.common import create_response
+from src.exceptions import DatabaseError
+from src.handlers.decorators import inject_services
+from src.utils.profiling import profiled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+@profiled
+@inject_services(dynamodb=True, aggregates=True)
+def handler(event, context, dynamodb_service=None, aggregates_service=None):
+    """Image counts from the counters maintained on upload/delete (one GetItem).
+
+    ?mode=scan recounts with a parallel Select=COUNT scan of the metadata table
+    instead, for reconciling the counters; it reads the whole table.
+    """
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        content_type = query_params.get('contentType')
+        tag = query_params.get('tags')
+        mode = query_params.get('mode', 'counters')
+        if mode not in ('counters', 'scan'):
+            return create_response(400, {"message": "'mode' must be 'counters' or 'scan'."})
+
+        if mode == 'scan':
+            count = dynamodb_service.count_items(content_type=content_type, tag=tag)
+            body = {"mode": mode, "count": count}
+        elif content_type:
+            body = {"mode": mode, "count": aggregates_service.get_image_counts()['contentTypes'].get(content_type, 0)}
+        elif tag:
+            body = {"mode": mode, "count": aggregates_service.get_tag_count(tag)}
+        else:
+            counts = aggregates_service.get_image_counts()
+            body = {"mode": mode, "count": counts['total'], "contentTypes": counts['contentTypes']}
+
+        if content_type:
+            body['contentType'] = content_type
+        elif tag:
+            body['tags'] = tag
+        return create_response(200, body)
+
+    except DatabaseError as e:
+        logger.error(f"Service error getting image stats: {e}")
+        return create_response(500, {"message": "A service error occurred."})
+    except Exception as e:
+        logger.error(f"Error getting image stats: {e}")
+        return create_response(500, {"message": "Internal server error"})
@@ -1,55 +1,104 @@
-import base64
-import binascii
-import json
 import logging
-from src.handlers.common import create_response, DecimalEncoder
-from src.exceptions import DatabaseError, ImageNotFoundError, InvalidRequestError
+import os
+import time
+from src.handlers.common import create_response, owner_from_event, with_extra
+from src.exceptions import DatabaseError, ImageNotFoundError, InvalidCursorError, InvalidRequestError, S3Error
 from src.handlers.decorators import inject_services
+from src.utils.cursor import decode_cursor, encode_cursor
+from src.utils.page_cache import content_type_pages
+from src.utils.profiling import profiled
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# The first pages of each contentType are cached per container (see
+# src.utils.page_cache). 'shared' also reads them from the aggregates table,
+# where refresh_page_cache rewrites them on a schedule, before falling back to
+# the ContentTypeIndex.
+CONTENT_TYPE_PAGE_CACHE = os.environ.get("CONTENT_TYPE_PAGE_CACHE", "local")
+SHARED_PAGE_MAX_AGE_SECONDS = int(os.environ.get("SHARED_PAGE_MAX_AGE_SECONDS", "300"))
 
-@inject_services(dynamodb=True)
-def handler(event, context, dynamodb_service=None):
+
+def content_type_page(dynamodb_service, aggregates_service, content_type, exclusive_start_key):
+    page = content_type_pages.get(content_type, exclusive_start_key)
+    if page is not None:
+        return page
+
+    generation = content_type_pages.generation
+    if CONTENT_TYPE_PAGE_CACHE == 'shared':
+        try:
+            page = aggregates_service.get_cached_page(
+                content_type, exclusive_start_key, SHARED_PAGE_MAX_AGE_SECONDS, int(time.time())
+            )
+        except DatabaseError as e:
+            logger.warning(f"Shared page cache unavailable: {e}")
+    if page is None:
+        page = dynamodb_service.query_by_content_type(content_type, exclusive_start_key)
+    content_type_pages.put(content_type, exclusive_start_key, *page, generation=generation)
+    return page
+
+
+@profiled
+@inject_services(s3=True, dynamodb=True, aggregates=True)
+def handler(event, context, s3_service=None, dynamodb_service=None, aggregates_service=None):
     try:
         query_params = event.get('queryStringParameters') or {}
-        exclusive_start_key = None
 
+        if 'imageId' in query_params:
+            item = with_extra(s3_service, dynamodb_service.get_item(query_params['imageId']))
+            return create_response(200, {"items": [item] if item else []})
+
+        owner = None
+        if 'owner' in query_params:
+            if query_params['owner'] != 'me':
+                return create_response(400, {"message": "'owner' must be 'me'."})
+            owner = owner_from_event(event)
+            if owner is None:
+                return create_response(401, {"message": "owner=me requires an authenticated caller."})
+
+        if owner:
+            # The cursor is bound to the owner and the filter, so it cannot page through someone else's images.
+            access_path = 'owner'
+            filter_value = f"{owner}\x00{query_params.get('contentType', '')}\x00{query_params.get('tags', '')}"
+        elif 'contentType' in query_params:
+            access_path, filter_value = 'contentType', query_params['contentType']
+        elif 'tags' in query_params:
+            access_path, filter_value = 'tags', query_params['tags']
+        else:
+            access_path, filter_value = 'scan', None
+
+        exclusive_start_key = None
         if 'nextToken' in query_params:
             try:
-                exclusive_start_key = json.loads(base64.b64decode(query_params['nextToken']))
-            except (TypeError, json.JSONDecodeError, binascii.Error) as e:
+                exclusive_start_key = decode_cursor(query_params['nextToken'], access_path, filter_value)
+            except InvalidCursorError as e:
+                logger.warning(f"Rejected nextToken: {e}")
                 return create_response(400, {"message": "Invalid nextToken format."})
 
-        if 'imageId' in query_params:
-            item = dynamodb_service.get_item(query_params['imageId'])
-            items = [item] if item else []
-            last_evaluated_key = None
-
-        elif 'contentType' in query_params:
-            items, last_evaluated_key = dynamodb_service.query_by_content_type(
-                query_params['contentType'], exclusive_start_key
+        if access_path == 'owner':
+            items, last_evaluated_key = dynamodb_service.query_by_owner(
+                owner, exclusive_start_key,
+                content_type=query_params.get('contentType'), tag=query_params.get('tags')
             )
-
-        elif 'tags' in query_params:
-            items, last_evaluated_key = dynamodb_service.query_by_tag(
-                query_params['tags'], exclusive_start_key
+        elif access_path == 'contentType':
+            items, last_evaluated_key = content_type_page(
+                dynamodb_service, aggregates_service, filter_value, exclusive_start_key
             )
-
+        elif access_path == 'tags':
+            items, last_evaluated_key = dynamodb_service.query_by_tag(filter_value, exclusive_start_key)
         else:
             items, last_evaluated_key = dynamodb_service.scan_items(exclusive_start_key)
 
         response_body = {"items": items}
         if last_evaluated_key:
-            response_body['nextToken'] = base64.b64encode(json.dumps(last_evaluated_key, cls=DecimalEncoder).encode('utf-8')).decode('utf-8')
+            response_body['nextToken'] = encode_cursor(access_path, last_evaluated_key, filter_value)
 
         return create_response(200, response_body)
 
     except ImageNotFoundError as e:
         logger.warning(f"Image not found when listing: {e}")
         return create_response(404, {"message": str(e)})
-    except (DatabaseError, InvalidRequestError) as e:
+    except (DatabaseError, S3Error, InvalidRequestError) as e:
         logger.error(f"Service error listing images: {e}")
         return create_response(500, {"message": "A service error occurred."})
     except Exception as e:
@@ -0,0 +1,60 @@
+import logging
+import os
+import threading
+import time
+from src.handlers.common import create_response
+from src.exceptions import DatabaseError
+from src.handlers.decorators import inject_services
+from src.services.aggregates_service import tag_shard
+from src.utils.tag_trie import TagTrie
+from src.utils.profiling import profiled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+TAG_CACHE_TTL_SECONDS = int(os.environ.get("TAG_CACHE_TTL_SECONDS", "60"))
+
+# shard -> (TagTrie, loaded_at). The '' shard holds every tag and backs
+# requests without a prefix.
+_tries = {}
+_tries_lock = threading.Lock()
+
+
+def get_trie(aggregates_service, prefix):
+    shard = tag_shard(prefix) if prefix else ''
+    with _tries_lock:
+        cached = _tries.get(shard)
+        if cached and time.monotonic() - cached[1] < TAG_CACHE_TTL_SECONDS:
+            return cached[0]
+
+    tags = aggregates_service.query_tags(prefix[:1]) if prefix else aggregates_service.all_tags()
+    trie = TagTrie(tags)
+    with _tries_lock:
+        _tries[shard] = (trie, time.monotonic())
+    return trie
+
+
+@profiled
+@inject_services(aggregates=True)
+def handler(event, context, aggregates_service=None):
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        prefix = query_params.get('prefix', '')
+        try:
+            limit = int(query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return create_response(400, {"message": "'limit' must be an integer."})
+        if not 1 <= limit <= MAX_LIMIT:
+            return create_response(400, {"message": f"'limit' must be between 1 and {MAX_LIMIT}."})
+
+        matches = get_trie(aggregates_service, prefix).complete(prefix, limit)
+        return create_response(200, {"items": [{"tag": tag, "count": count} for tag, count in matches]})
+
+    except DatabaseError as e:
+        logger.error(f"Service error listing tags: {e}")
+        return create_response(500, {"message": "A service error occurred."})
+    except Exception as e:
+        logger.error(f"Error listing tags: {e}")
+        return create_response(500, {"message": "Internal server error"})
@@ -0,0 +1,82 @@
+import json
+import logging
+import time
+import uuid
+from urllib.parse import unquote_plus
+from src.exceptions import InvalidRequestError, ImageNotFoundError
+from src.handlers.decorators import inject_services
+from src.models.image_metadata import EXTRA_PREFIX, hash_bucket
+from src.utils.image_hash import dhash, format_hash
+from src.utils.profiling import profiled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+UUID_LENGTH = 36
+PROFILE_PREFIX = "debug/"
+INDEX_PREFIX = "index/"
+
+
+def image_id_from_key(object_key):
+    """upload_image stores objects as '<imageId>-<filename>'."""
+    image_id = object_key[:UUID_LENGTH]
+    try:
+        uuid.UUID(image_id)
+    except ValueError:
+        raise InvalidRequestError(f"Object key '{object_key}' does not start with an image ID.")
+    return image_id
+
+
+def _s3_records(message):
+    # s3:TestEvent messages sent when the notification is configured carry no Records.
+    # Copies are the tiering job rewriting an existing object in place, and
+    # extra-field side objects, profiles and index snapshots are not images;
+    # none needs enrichment.
+    for record in message.get('Records', []):
+        if (record.get('eventSource') == 'aws:s3' and record['eventName'].startswith('ObjectCreated:')
+                and record['eventName'] != 'ObjectCreated:Copy'):
+            object_key = unquote_plus(record['s3']['object']['key'])
+            if not object_key.startswith((EXTRA_PREFIX, PROFILE_PREFIX, INDEX_PREFIX)):
+                yield object_key
+
+
+def enrich(object_key, s3_service, dynamodb_service):
+    image_id = image_id_from_key(object_key)
+    attributes = {'status': 'ready', 'processedTimestamp': int(time.time())}
+    try:
+        attributes['phash'] = format_hash(dhash(s3_service.get_file(object_key)))
+        attributes['hashBucket'] = hash_bucket(attributes['processedTimestamp'])
+    except InvalidRequestError as e:
+        logger.warning(f"Image {image_id} stored without a perceptual hash: {e}")
+    dynamodb_service.update_item(image_id, attributes)
+    return image_id
+
+
+@profiled
+@inject_services(s3=True, dynamodb=True)
+def handler(event, context, s3_service=None, dynamodb_service=None):
+    """Post-upload enrichment, fed by S3 ObjectCreated notifications through SQS.
+
+    Each SQS message is processed independently; failed messages are returned in
+    batchItemFailures so only they are retried (and eventually dead-lettered).
+    """
+    failures = []
+    for record in event.get('Records', []):
+        message_id = record.get('messageId')
+        try:
+            message = json.loads(record['body']) if record.get('eventSource') == 'aws:sqs' else {'Records': [record]}
+            for object_key in _s3_records(message):
+                image_id = enrich(object_key, s3_service, dynamodb_service)
+                logger.info(f"Processed image {image_id}")
+        except InvalidRequestError as e:
+            # Not an object upload_image wrote; retrying will not help.
+            logger.warning(f"Skipping message {message_id}: {e}")
+        except ImageNotFoundError as e:
+            # The object can be reported before upload_image has written the row; retry later.
+            logger.warning(f"Metadata not written yet for message {message_id}: {e}")
+            failures.append({"itemIdentifier": message_id})
+        except Exception as e:
+            logger.error(f"Error processing message {message_id}: {e}")
+            failures.append({"itemIdentifier": message_id})
+
+    return {"batchItemFailures": failures}
@@ -0,0 +1,47 @@
+import logging
+import os
+import time
+from src.exceptions import DatabaseError
+from src.handlers.decorators import inject_services
+from src.utils.page_cache import CONTENT_TYPE_CACHE_PAGES
+from src.utils.profiling import profiled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# How many of the most common content types get shared first pages.
+SHARED_CACHE_CONTENT_TYPES = int(os.environ.get("SHARED_CACHE_CONTENT_TYPES", "5"))
+
+
+def refresh(content_type, dynamodb_service, aggregates_service, now):
+    """Re-read the first CONTENT_TYPE_CACHE_PAGES pages of a content type into the shared cache."""
+    start_key, stored = None, 0
+    for _ in range(CONTENT_TYPE_CACHE_PAGES):
+        items, last_evaluated_key = dynamodb_service.query_by_content_type(content_type, start_key)
+        if not aggregates_service.put_cached_page(content_type, start_key, items, last_evaluated_key, now):
+            logger.warning(f"Page {stored} of '{content_type}' is too large to share")
+            break
+        stored += 1
+        if not last_evaluated_key:
+            break
+        start_key = last_evaluated_key
+    return stored
+
+
+@profiled
+@inject_services(dynamodb=True, aggregates=True)
+def handler(event, context, dynamodb_service=None, aggregates_service=None):
+    """Scheduled job behind CONTENT_TYPE_PAGE_CACHE=shared (see list_images)."""
+    counts = aggregates_service.get_image_counts()['contentTypes']
+    popular = sorted(counts, key=counts.get, reverse=True)[:SHARED_CACHE_CONTENT_TYPES]
+    now = int(time.time())
+
+    refreshed = {}
+    for content_type in popular:
+        try:
+            refreshed[content_type] = refresh(content_type, dynamodb_service, aggregates_service, now)
+        except DatabaseError as e:
+            logger.error(f"Failed to refresh cached pages for '{content_type}': {e}")
+            refreshed[content_type] = 0
+    logger.info(f"Refreshed shared pages: {refreshed}")
+    return {"refreshed": refreshed}
@@ -0,0 +1,62 @@
+import logging
+import re
+from src.handlers.common import create_response
+from src.handlers import upload_image, list_images, get_image, delete_image, search_similar, list_tags, bulk_upload_images, image_stats
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# (method, API Gateway resource) -> handler. Every handler shares the service
+# instances cached by inject_services, so one warm container serves all routes.
+ROUTES = {
+    ('POST', '/images'): upload_image.handler,
+    ('POST', '/images/batch'): bulk_upload_images.handler,
+    ('GET', '/images'): list_images.handler,
+    ('GET', '/images/similar'): search_similar.handler,
+    ('GET', '/images/stats'): image_stats.handler,
+    ('GET', '/images/{imageId}'): get_image.handler,
+    ('DELETE', '/images/{imageId}'): delete_image.handler,
+    ('GET', '/tags'): list_tags.handler,
+}
+
+
+def _resource_pattern(resource):
+    return re.compile('^' + re.sub(r'\\{(\w+)\\}', r'(?P<\1>[^/]+)', re.escape(resource)) + '/?$')
+
+
+# Literal resources are tried before parameterised ones so '/images/stats'
+# never resolves to '/images/{imageId}'.
+_ROUTE_PATTERNS = [
+    (resource, _resource_pattern(resource))
+    for resource in sorted(dict.fromkeys(r for _, r in ROUTES), key=lambda r: r.count('{'))
+]
+
+
+_RESOURCES = {resource for resource, _ in _ROUTE_PATTERNS}
+
+
+def match_route(path):
+    """Resolve a raw request path to its API Gateway resource and path parameters."""
+    for resource, pattern in _ROUTE_PATTERNS:
+        match = pattern.match(path or '')
+        if match:
+            return resource, match.groupdict() or None
+    return None, None
+
+
+def handler(event, context):
+    method = (event.get('httpMethod') or '').upper()
+    resource = event.get('resource')
+
+    if resource not in _RESOURCES:
+        resource, path_parameters = match_route(event.get('path'))
+        if resource is None:
+            return create_response(404, {"message": "Not found"})
+        event = {**event, 'resource': resource, 'pathParameters': path_parameters}
+
+    route = ROUTES.get((method, resource))
+    if route is None:
+        return create_response(405, {"message": f"Method {method} not allowed on {resource}"})
+
+    logger.debug(f"Routing {method} {resource} to {route.__module__}")
+    return route(event, context)
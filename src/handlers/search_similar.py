@@ -0,0 +1,120 @@
+import logging
+import os
+import threading
+import time
+from botocore.exceptions import ClientError
+from src.handlers.common import create_response
+from src.exceptions import DatabaseError, ImageNotFoundError, InvalidRequestError, S3Error
+from src.handlers.decorators import inject_services
+from src.utils.image_hash import parse_hash
+from src.utils.profiling import profiled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DEFAULT_DISTANCE = 8
+MAX_DISTANCE = 32
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+INDEX_REFRESH_SECONDS = int(os.environ.get("SIMILARITY_INDEX_REFRESH_SECONDS", "60"))
+INDEX_REBUILD_SECONDS = int(os.environ.get("SIMILARITY_INDEX_REBUILD_SECONDS", "3600"))
+
+# The index lives for the lifetime of the container. It is loaded from the
+# snapshot build_similarity_snapshot writes to S3, topped up from HashIndex with
+# rows hashed since the snapshot every INDEX_REFRESH_SECONDS, and reloaded from
+# the latest snapshot every INDEX_REBUILD_SECONDS to drop deleted images.
+_index = None
+_watermark = None
+_refreshed_at = 0.0
+_rebuilt_at = 0.0
+_index_lock = threading.Lock()
+
+
+def _is_missing(error):
+    cause = error.__cause__
+    return isinstance(cause, ClientError) and cause.response.get('Error', {}).get('Code') in ('NoSuchKey', '404')
+
+
+def _load_snapshot(s3_service):
+    # Imported lazily so numpy only loads in containers that search.
+    from src.utils.hamming_index import HammingIndex
+    from src.utils.hash_snapshot import SNAPSHOT_KEY, unpack_snapshot
+    try:
+        ids, hashes, watermark = unpack_snapshot(s3_service.get_file(SNAPSHOT_KEY))
+    except S3Error as e:
+        if not _is_missing(e):
+            raise
+        # Until the snapshot job has run, only recently hashed images are searchable.
+        logger.warning(f"No similarity snapshot yet, starting from recent hashes: {e}")
+        return HammingIndex(), int(time.time()) - INDEX_REBUILD_SECONDS
+    return HammingIndex.from_arrays(ids, hashes), watermark
+
+
+def _load_since(index, dynamodb_service, watermark):
+    for item in dynamodb_service.query_hashes_since(watermark, int(time.time())):
+        index.add(item['imageId'], int(item['phash'], 16))
+        watermark = max(watermark, int(item['processedTimestamp']))
+    return watermark
+
+
+def get_index(s3_service, dynamodb_service):
+    global _index, _watermark, _refreshed_at, _rebuilt_at
+    with _index_lock:
+        now = time.monotonic()
+        if _index is None or now - _rebuilt_at > INDEX_REBUILD_SECONDS:
+            index, watermark = _load_snapshot(s3_service)
+            _watermark = _load_since(index, dynamodb_service, watermark)
+            _index, _rebuilt_at, _refreshed_at = index, now, now
+            logger.info(f"Loaded similarity index with {len(index)} hashes")
+        elif now - _refreshed_at > INDEX_REFRESH_SECONDS:
+            _watermark = _load_since(_index, dynamodb_service, _watermark)
+            _refreshed_at = now
+        return _index
+
+
+def _bounded_int(query_params, name, default, maximum):
+    try:
+        value = int(query_params.get(name, default))
+    except ValueError:
+        raise InvalidRequestError(f"'{name}' must be an integer.")
+    if not 0 <= value <= maximum:
+        raise InvalidRequestError(f"'{name}' must be between 0 and {maximum}.")
+    return value
+
+
+@profiled
+@inject_services(s3=True, dynamodb=True)
+def handler(event, context, s3_service=None, dynamodb_service=None):
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        distance = _bounded_int(query_params, 'distance', DEFAULT_DISTANCE, MAX_DISTANCE)
+        limit = _bounded_int(query_params, 'limit', DEFAULT_LIMIT, MAX_LIMIT)
+
+        image_id = query_params.get('imageId')
+        if image_id:
+            item = dynamodb_service.get_item(image_id)
+            if 'phash' not in item:
+                return create_response(409, {"message": f"Image '{image_id}' has no perceptual hash yet."})
+            query_hash = parse_hash(item['phash'])
+        elif 'hash' in query_params:
+            query_hash = parse_hash(query_params['hash'])
+        else:
+            return create_response(400, {"message": "Either 'imageId' or 'hash' is required."})
+
+        matches = get_index(s3_service, dynamodb_service).search(query_hash, distance, limit + 1 if image_id else limit)
+        items = [{"imageId": match_id, "distance": d} for match_id, d in matches if match_id != image_id]
+        return create_response(200, {"items": items[:limit]})
+
+    except InvalidRequestError as e:
+        logger.warning(f"Bad similarity search request: {e}")
+        return create_response(400, {"message": str(e)})
+    except ImageNotFoundError as e:
+        logger.warning(f"Image not found for similarity search: {e}")
+        return create_response(404, {"message": str(e)})
+    except (DatabaseError, S3Error) as e:
+        logger.error(f"Service error searching similar images: {e}")
+        return create_response(500, {"message": "A service error occurred."})
+    except Exception as e:
+        logger.error(f"Error searching similar images: {e}")
+        return create_response(500, {"message": "Internal server error"})
@@ -0,0 +1,67 @@
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.exceptions import S3Error, DatabaseError, ImageNotFoundError
+from src.handlers.decorators import inject_services
+from src.utils.profiling import profiled
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Originals with no sampled read (see get_image) for this long are moved out of STANDARD.
+COLD_AFTER_DAYS = int(os.environ.get("COLD_AFTER_DAYS", "30"))
+TIER_STORAGE_CLASS = os.environ.get("TIER_STORAGE_CLASS", "STANDARD_IA")
+# STANDARD_IA bills objects as at least 128 KB and Intelligent-Tiering does not
+# tier them, so smaller ones stay in STANDARD.
+MIN_TIER_BYTES = int(os.environ.get("MIN_TIER_BYTES", str(128 * 1024)))
+# Larger objects would need a multipart copy, which process_image would see as
+# a new upload, so they stay in STANDARD too.
+MAX_TIER_BYTES = 5 * 1024 ** 3
+TIER_MAX_OBJECTS = int(os.environ.get("TIER_MAX_OBJECTS", "1000"))
+TIER_COPY_WORKERS = int(os.environ.get("TIER_COPY_WORKERS", "8"))
+
+
+def tier(row, s3_service, dynamodb_service):
+    """Move one original to TIER_STORAGE_CLASS and record the class it ended up in."""
+    size, _ = s3_service.head_file(row['s3_key'])
+    storage_class = TIER_STORAGE_CLASS if MIN_TIER_BYTES <= size <= MAX_TIER_BYTES else 'STANDARD'
+    if storage_class != 'STANDARD':
+        s3_service.set_storage_class(row['s3_key'], storage_class)
+    # Rows with a storageClass are not candidates again, including the ones
+    # kept in STANDARD.
+    dynamodb_service.update_item(row['imageId'], {'storageClass': storage_class, 'tieredTimestamp': int(time.time())})
+    return storage_class
+
+
+@profiled
+@inject_services(s3=True, dynamodb=True)
+def handler(event, context, s3_service=None, dynamodb_service=None):
+    """Scheduled job: moves cold originals to a cheaper storage class.
+
+    At most TIER_MAX_OBJECTS are handled per run and copies run
+    TIER_COPY_WORKERS at a time; the rest are picked up by the next run.
+    """
+    cutoff = int(time.time()) - COLD_AFTER_DAYS * 24 * 60 * 60
+    candidates = list(itertools.islice(dynamodb_service.scan_tiering_candidates(cutoff), TIER_MAX_OBJECTS))
+
+    def run(row):
+        try:
+            return tier(row, s3_service, dynamodb_service)
+        except (S3Error, DatabaseError, ImageNotFoundError) as e:
+            logger.error(f"Failed to tier image {row['imageId']}: {e}")
+            return None
+
+    summary = {"candidates": len(candidates), "tiered": 0, "kept": 0, "failed": 0}
+    if candidates:
+        with ThreadPoolExecutor(max_workers=min(TIER_COPY_WORKERS, len(candidates))) as pool:
+            for storage_class in pool.map(run, candidates):
+                if storage_class is None:
+                    summary["failed"] += 1
+                elif storage_class == 'STANDARD':
+                    summary["kept"] += 1
+                else:
+                    summary["tiered"] += 1
+    logger.info(f"Tiering run: {summary}")
+    return summary
@@ -1,17 +1,18 @@
 import uuid
 import logging
-import time
-from src.handlers.common import create_response
+from src.handlers.common import create_response, build_metadata, owner_from_event, store_upload
 from src.utils.multipart_parser import parse_multipart
 from src.exceptions import InvalidRequestError, S3Error, DatabaseError
 from src.handlers.decorators import inject_services
+from src.utils.profiling import profiled
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
-@inject_services(s3=True, dynamodb=True)
-def handler(event, context, s3_service=None, dynamodb_service=None):
+@profiled
+@inject_services(s3=True, dynamodb=True, aggregates=True)
+def handler(event, context, s3_service=None, dynamodb_service=None, aggregates_service=None):
     try:
         form_data, files = parse_multipart(event)
 
@@ -22,23 +23,17 @@ def handler(event, context, s3_service=None, dynamodb_service=None):
         image_id = str(uuid.uuid4())
         file_name = f"{image_id}-{image_file.filename}"
 
-        s3_service.upload_file(image_file.read(), file_name, image_file.content_type)
+        metadata = build_metadata(image_id, file_name, image_file, form_data, owner_from_event(event))
+        store_upload(s3_service, metadata, image_file)
 
-        metadata = {k: v for k, v in form_data.items()}
+        item = metadata.to_item()
+        dynamodb_service.put_item(item)
 
-        if 'tags' in metadata and isinstance(metadata['tags'], str):
-            metadata['tags'] = [tag.strip() for tag in metadata['tags'].split(',')]
+        try:
+            aggregates_service.record_images([item], 1)
+        except DatabaseError as e:
+            logger.error(f"Failed to update aggregates for image {image_id}: {e}")
 
-        metadata.update({
-            'imageId': image_id,
-            'filename': image_file.filename,
-            's3_key': file_name,
-            'contentType': image_file.content_type,
-            'uploadTimestamp': int(time.time()),
-        })
-
-        dynamodb_service.put_item(metadata)
-        
         return create_response(201, {"message": "Image uploaded successfully", "imageId": image_id})
 
     except InvalidRequestError as e:
@@ -0,0 +1,248 @@
+"""In-process HTTP server for the Lambda handlers.
+
+Translates plain HTTP requests into API Gateway proxy events, dispatches them
+through the router and serves the results, with S3 and DynamoDB provided by
+moto in the same process. Handy for load generators and profilers:
+
+    python -m src.local.dev_server --port 8000
+    python -m cProfile -o dev.prof -m src.local.dev_server --port 8000
+    py-spy record -o flame.svg --pid <dev server pid>
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from werkzeug.wrappers import Request, Response
+from src.handlers import router, process_image
+
+logger = logging.getLogger(__name__)
+
+# Mirrors BinaryMediaTypes on ImageServiceApi in template.yaml.
+BINARY_MEDIA_TYPES = ("*/*",)
+
+DEFAULT_ENV = {
+    "IMAGE_BUCKET_NAME": "local-image-bucket",
+    "METADATA_TABLE_NAME": "local-metadata-table",
+    "AGGREGATES_TABLE_NAME": "local-aggregates-table",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+}
+
+
+def _is_binary(content_type):
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return "*/*" in BINARY_MEDIA_TYPES or media_type in BINARY_MEDIA_TYPES
+
+
+def build_event(request):
+    """Build the API Gateway REST proxy event for a werkzeug request."""
+    resource, path_parameters = router.match_route(request.path)
+    body = request.get_data()
+    is_base64 = bool(body) and _is_binary(request.content_type)
+    if is_base64:
+        body = base64.b64encode(body).decode("utf-8")
+    else:
+        body = body.decode("utf-8") if body else None
+
+    query = request.args
+    request_context = {
+        "resourcePath": resource,
+        "httpMethod": request.method,
+        "path": request.path,
+        "stage": "local",
+        "requestId": str(uuid.uuid4()),
+        "requestTimeEpoch": int(time.time() * 1000),
+        "identity": {"sourceIp": request.remote_addr},
+    }
+    # Stands in for an API Gateway authorizer, e.g. to try out ?owner=me.
+    if request.headers.get("X-Local-User"):
+        request_context["authorizer"] = {"principalId": request.headers["X-Local-User"]}
+    return {
+        "resource": resource,
+        "path": request.path,
+        "httpMethod": request.method,
+        "headers": dict(request.headers),
+        "multiValueHeaders": {k: request.headers.getlist(k) for k in request.headers.keys()},
+        "queryStringParameters": query.to_dict() or None,
+        "multiValueQueryStringParameters": query.to_dict(flat=False) or None,
+        "pathParameters": path_parameters,
+        "requestContext": request_context,
+        "body": body,
+        "isBase64Encoded": is_base64,
+    }
+
+
+def build_response(result):
+    """Turn a Lambda proxy result back into a werkzeug response."""
+    body = result.get("body") or ""
+    if result.get("isBase64Encoded"):
+        body = base64.b64decode(body)
+    return Response(body, status=result["statusCode"], headers=result.get("headers") or {})
+
+
+class LambdaContext:
+    function_name = "local-dev-server"
+    memory_limit_in_mb = 128
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+
+class LocalProcessingQueue:
+    """Stand-in for the S3 -> SQS -> ProcessImageFunction pipeline.
+
+    Uploads are fed to process_image.handler as SQS-wrapped S3 notifications on
+    a background thread, so the upload response returns before enrichment runs,
+    as it does when deployed.
+    """
+
+    def __init__(self, handler=process_image.handler):
+        self.handler = handler
+        self._queue = queue.Queue()
+        threading.Thread(target=self._work, daemon=True).start()
+
+    def notify_object_created(self, object_key):
+        self._queue.put({
+            "messageId": str(uuid.uuid4()),
+            "eventSource": "aws:sqs",
+            "body": json.dumps({"Records": [{
+                "eventSource": "aws:s3",
+                "eventName": "ObjectCreated:Put",
+                "s3": {"bucket": {"name": os.environ["IMAGE_BUCKET_NAME"]}, "object": {"key": object_key}},
+            }]}),
+        })
+
+    def drain(self):
+        """Block until every queued notification has been processed."""
+        self._queue.join()
+
+    def _work(self):
+        while True:
+            record = self._queue.get()
+            try:
+                result = self.handler({"Records": [record]}, LambdaContext())
+                if result["batchItemFailures"]:
+                    logger.warning(f"Local processing failed for message {record['messageId']}")
+            except Exception as e:
+                logger.error(f"Local processing crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+def _created_objects(request, result):
+    """S3 keys written by an upload, named '<imageId>-<filename>' as upload_image stores them."""
+    if result["statusCode"] not in (201, 207):
+        return []
+    body = json.loads(result["body"])
+    if request.path == "/images":
+        return [f"{body['imageId']}-{request.files['file'].filename}"]
+    if request.path == "/images/batch":
+        return [f"{r['imageId']}-{r['filename']}" for r in body["results"] if r["status"] == "uploaded"]
+    return []
+
+
+def create_app(handler=router.handler, processing_queue=None):
+    @Request.application
+    def app(request):
+        result = handler(build_event(request), LambdaContext())
+        if processing_queue and request.method == "POST":
+            for object_key in _created_objects(request, result):
+                processing_queue.notify_object_created(object_key)
+        return build_response(result)
+    return app
+
+
+def create_local_resources(s3_client, dynamodb_resource):
+    """Create the bucket and tables from template.yaml against the given clients."""
+    s3_client.create_bucket(Bucket=os.environ["IMAGE_BUCKET_NAME"])
+    dynamodb_resource.create_table(
+        TableName=os.environ["METADATA_TABLE_NAME"],
+        KeySchema=[{"AttributeName": "imageId", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "imageId", "AttributeType": "S"},
+            {"AttributeName": "contentType", "AttributeType": "S"},
+            {"AttributeName": "ownerShard", "AttributeType": "S"},
+            {"AttributeName": "ownerSortKey", "AttributeType": "S"},
+            {"AttributeName": "hashBucket", "AttributeType": "N"},
+            {"AttributeName": "processedTimestamp", "AttributeType": "N"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "ContentTypeIndex",
+                "KeySchema": [{"AttributeName": "contentType", "KeyType": "HASH"}],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": "OwnerIndex",
+                "KeySchema": [
+                    {"AttributeName": "ownerShard", "KeyType": "HASH"},
+                    {"AttributeName": "ownerSortKey", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": "HashIndex",
+                "KeySchema": [
+                    {"AttributeName": "hashBucket", "KeyType": "HASH"},
+                    {"AttributeName": "processedTimestamp", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["phash"]},
+            }
+        ],
+    )
+    dynamodb_resource.create_table(
+        TableName=os.environ["AGGREGATES_TABLE_NAME"],
+        KeySchema=[
+            {"AttributeName": "pk", "KeyType": "HASH"},
+            {"AttributeName": "sk", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "pk", "AttributeType": "S"},
+            {"AttributeName": "sk", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+@contextmanager
+def local_backend():
+    """Run the enclosed block against in-memory S3 and DynamoDB provided by moto."""
+    import boto3
+    from moto import mock_aws
+
+    for key, value in DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+
+    with mock_aws():
+        region = os.environ["AWS_DEFAULT_REGION"]
+        create_local_resources(
+            boto3.client("s3", region_name=region),
+            boto3.resource("dynamodb", region_name=region),
+        )
+        yield
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the image service handlers over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-threads", action="store_true", help="Serve one request at a time")
+    args = parser.parse_args()
+
+    from werkzeug.serving import run_simple
+    logging.basicConfig(level=logging.INFO)
+    with local_backend():
+        app = create_app(processing_queue=LocalProcessingQueue())
+        run_simple(args.host, args.port, app, threaded=not args.no_threads)
+
+
+if __name__ == "__main__":
+    main()
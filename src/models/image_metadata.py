@@ -0,0 +1,149 @@
+import json
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional
+from src.exceptions import InvalidRequestError
+
+MAX_FILENAME_LENGTH = 255
+MAX_CONTENT_TYPE_LENGTH = 255
+MAX_DESCRIPTION_LENGTH = 2000
+MAX_TAGS = 20
+MAX_TAG_LENGTH = 64
+MAX_EXTRA_FIELDS = 50
+MAX_EXTRA_BYTES = 16 * 1024
+
+# Undeclared form fields are kept out of the row, in an S3 side object.
+EXTRA_PREFIX = "metadata/"
+
+# Each owner's rows are spread over this many OwnerIndex partitions so one
+# busy uploader cannot make a hot partition. Changing it strands existing rows.
+OWNER_SHARDS = 4
+
+# Hashed rows are indexed by HashIndex under the hour they were processed in, so
+# the similarity index can Query what changed since its last refresh.
+HASH_BUCKET_SECONDS = 3600
+
+_EXTRA_NAME_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9_-]{0,63}$')
+
+
+def extra_key(image_id):
+    return f"{EXTRA_PREFIX}{image_id}.json"
+
+
+def owner_shards(owner):
+    return [f"{owner}#{shard}" for shard in range(OWNER_SHARDS)]
+
+
+def owner_sort_key(upload_timestamp, image_id):
+    """OwnerIndex sort key: newest-first order when queried descending, unique per image."""
+    return f"{upload_timestamp:010d}#{image_id}"
+
+
+def hash_bucket(processed_timestamp):
+    return int(processed_timestamp) // HASH_BUCKET_SECONDS
+
+
+def _parse_tags(value):
+    tags = []
+    for tag in (value.split(',') if isinstance(value, str) else value):
+        if not isinstance(tag, str):
+            raise InvalidRequestError("Each tag must be a string.")
+        tag = tag.strip()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+@dataclass(slots=True)
+class ImageMetadata:
+    """The metadata row written for an upload.
+
+    Only declared fields are stored on the row. Any other form fields go to
+    `extra`, which is stored as a JSON side object at extra_key(imageId) and
+    flagged on the row with hasExtra. Rows with an owner are also indexed
+    by OwnerIndex (ownerShard, ownerSortKey). Later stages add their own attributes
+    (status, phash, storageClass, ...) with UpdateItem.
+    """
+    imageId: str
+    filename: str
+    s3_key: str
+    contentType: Optional[str]
+    uploadTimestamp: int
+    # Enrichment (perceptual hash etc.) runs in process_image once S3 reports
+    # the object, which flips the status to 'ready'.
+    status: str = 'processing'
+    description: Optional[str] = None
+    tags: list = field(default_factory=list)
+    extra: dict = field(default_factory=dict)
+    owner: Optional[str] = None
+
+    def __post_init__(self):
+        _check_length('filename', self.filename, MAX_FILENAME_LENGTH)
+        if self.contentType is not None:
+            _check_length('contentType', self.contentType, MAX_CONTENT_TYPE_LENGTH)
+        if self.description is not None:
+            _check_length('description', self.description, MAX_DESCRIPTION_LENGTH)
+        if len(self.tags) > MAX_TAGS:
+            raise InvalidRequestError(f"At most {MAX_TAGS} tags are allowed.")
+        for tag in self.tags:
+            _check_length('Each tag', tag, MAX_TAG_LENGTH)
+
+        if len(self.extra) > MAX_EXTRA_FIELDS:
+            raise InvalidRequestError(f"At most {MAX_EXTRA_FIELDS} additional fields are allowed.")
+        for name, value in self.extra.items():
+            if not _EXTRA_NAME_PATTERN.match(name):
+                raise InvalidRequestError(f"Invalid field name '{name}'.")
+            if not isinstance(value, str):
+                raise InvalidRequestError(f"Field '{name}' must be a string.")
+        if len(self.extra_document()) > MAX_EXTRA_BYTES:
+            raise InvalidRequestError(f"Additional fields must total at most {MAX_EXTRA_BYTES} bytes.")
+
+    @classmethod
+    def from_form(cls, image_id, s3_key, filename, content_type, form_fields, upload_timestamp, owner=None):
+        fields = dict(form_fields)
+        description = fields.pop('description', None)
+        tags = _parse_tags(fields.pop('tags', ''))
+        return cls(
+            imageId=image_id,
+            filename=filename,
+            s3_key=s3_key,
+            contentType=content_type,
+            uploadTimestamp=upload_timestamp,
+            description=description or None,
+            tags=tags,
+            extra=fields,
+            owner=owner,
+        )
+
+    def to_item(self):
+        item = {
+            'imageId': self.imageId,
+            'filename': self.filename,
+            's3_key': self.s3_key,
+            'uploadTimestamp': self.uploadTimestamp,
+            'status': self.status,
+        }
+        if self.contentType is not None:
+            item['contentType'] = self.contentType
+        if self.description is not None:
+            item['description'] = self.description
+        if self.tags:
+            item['tags'] = list(self.tags)
+        if self.extra:
+            item['hasExtra'] = True
+        if self.owner is not None:
+            item['owner'] = self.owner
+            item['ownerShard'] = owner_shards(self.owner)[zlib.crc32(self.imageId.encode('utf-8')) % OWNER_SHARDS]
+            item['ownerSortKey'] = owner_sort_key(self.uploadTimestamp, self.imageId)
+        return item
+
+    def extra_document(self):
+        return json.dumps(self.extra, separators=(',', ':')).encode('utf-8')
+
+
+def _check_length(name, value, limit):
+    if not isinstance(value, str):
+        raise InvalidRequestError(f"{name} must be a string.")
+    if len(value) > limit:
+        raise InvalidRequestError(f"{name} must be at most {limit} characters.")
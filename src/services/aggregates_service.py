@@ -0,0 +1,218 @@
+import boto3
+import json
+import os
+import logging
+import zlib
+from collections import Counter
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from src.config import config
+from src.exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+TAG_PREFIX = 'TAG#'
+STATS_KEY = {'pk': 'STATS', 'sk': 'IMAGES'}
+# One item per tag shard in use, so listing every tag queries the tag
+# partitions instead of scanning the table. The marker records that shards
+# counted before the directory existed have been added to it.
+TAG_SHARDS_PK = 'TAG_SHARDS'
+TAG_SHARDS_BACKFILLED_KEY = {'pk': 'STATS', 'sk': 'TAG_SHARDS'}
+CONTENT_TYPE_PREFIX = 'contentType:'
+PAGE_PREFIX = 'PAGES#'
+# Leaves headroom under DynamoDB's 400 KB item limit; larger pages are not shared.
+MAX_SHARED_PAGE_BYTES = 350 * 1024
+
+
+def _page_sort_key(start_key):
+    return json.dumps(start_key, sort_keys=True) if start_key else '-'
+
+
+def _plain_number(value):
+    if isinstance(value, Decimal):
+        return int(value) if value % 1 == 0 else float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def tag_shard(tag):
+    """Partition key for a tag: tags are sharded by their first character so a
+    prefix lookup is a single-partition Query over sorted tag names."""
+    return f"{TAG_PREFIX}{tag[:1]}"
+
+
+class AggregatesService:
+    def __init__(self, dynamodb_resource=None): # pragma: no cover
+        self.table_name = os.environ.get("AGGREGATES_TABLE_NAME")
+        if not self.table_name:
+            raise ValueError("AGGREGATES_TABLE_NAME environment variable not set.")
+
+        if dynamodb_resource:
+            self.dynamodb_resource = dynamodb_resource
+        else:
+            boto_kwargs = {
+                "region_name": config.AWS_REGION,
+                **config.BOTO3_CREDENTIALS
+            }
+            if config.DYNAMODB_ENDPOINT_URL:
+                boto_kwargs["endpoint_url"] = config.DYNAMODB_ENDPOINT_URL
+
+            self.dynamodb_resource = boto3.resource("dynamodb", **boto_kwargs)
+        self.table = self.dynamodb_resource.Table(self.table_name)
+
+    def record_images(self, rows, delta):
+        """Count metadata rows into (delta=1) or out of (delta=-1) every aggregate."""
+        content_types = Counter(row['contentType'] for row in rows if row.get('contentType'))
+        self.add_image_counts(len(rows) * delta, {ct: n * delta for ct, n in content_types.items()})
+        tags = Counter(tag for row in rows for tag in set(row.get('tags') or []) if tag)
+        self.add_tag_counts({tag: n * delta for tag, n in tags.items()})
+
+    def add_image_counts(self, total_delta, content_type_deltas):
+        """Total and per-contentType counts share one item, updated with one atomic ADD."""
+        names = {'#total': 'total'}
+        values = {':total': total_delta}
+        clauses = ['#total :total']
+        for i, (content_type, delta) in enumerate(content_type_deltas.items()):
+            names[f'#ct{i}'] = f'{CONTENT_TYPE_PREFIX}{content_type}'
+            values[f':ct{i}'] = delta
+            clauses.append(f'#ct{i} :ct{i}')
+        try:
+            self.table.update_item(
+                Key=STATS_KEY,
+                UpdateExpression='ADD ' + ', '.join(clauses),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+        except ClientError as e:
+            raise DatabaseError(f"Failed to update image counts: {e}") from e
+
+    def get_image_counts(self):
+        try:
+            item = self.table.get_item(Key=STATS_KEY).get('Item', {})
+        except ClientError as e:
+            raise DatabaseError(f"Failed to get image counts: {e}") from e
+        return {
+            'total': int(item.get('total', 0)),
+            'contentTypes': {
+                name[len(CONTENT_TYPE_PREFIX):]: int(count)
+                for name, count in item.items()
+                if name.startswith(CONTENT_TYPE_PREFIX) and count > 0
+            },
+        }
+
+    def get_tag_count(self, tag):
+        try:
+            item = self.table.get_item(Key={'pk': tag_shard(tag), 'sk': tag}).get('Item', {})
+        except ClientError as e:
+            raise DatabaseError(f"Failed to get count for tag '{tag}': {e}") from e
+        return int(item.get('count', 0))
+
+    def add_tag_counts(self, deltas):
+        """Apply {tag: delta}; counters that reach zero are removed."""
+        for tag, delta in deltas.items():
+            key = {'pk': tag_shard(tag), 'sk': tag}
+            try:
+                response = self.table.update_item(
+                    Key=key,
+                    UpdateExpression='ADD #count :delta',
+                    ExpressionAttributeNames={'#count': 'count'},
+                    ExpressionAttributeValues={':delta': delta},
+                    ReturnValues='UPDATED_NEW',
+                )
+                if delta > 0 and response['Attributes']['count'] == delta:
+                    # A new counter; make sure its shard is listed.
+                    self.table.put_item(Item={'pk': TAG_SHARDS_PK, 'sk': tag[:1]})
+                elif response['Attributes']['count'] <= 0:
+                    self.table.delete_item(
+                        Key=key,
+                        ConditionExpression=Attr('count').lte(0),
+                    )
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                    continue  # Re-incremented between our update and delete.
+                raise DatabaseError(f"Failed to update count for tag '{tag}': {e}") from e
+
+    def query_tags(self, prefix):
+        """(tag, count) pairs for every tag starting with a non-empty prefix, in tag order."""
+        query_kwargs = {
+            'KeyConditionExpression': Key('pk').eq(tag_shard(prefix)) & Key('sk').begins_with(prefix),
+        }
+        return self._collect(self.table.query, query_kwargs, f"Failed to query tags with prefix '{prefix}'")
+
+    def all_tags(self):
+        """(tag, count) pairs for every tag, read shard by shard."""
+        try:
+            backfilled = 'Item' in self.table.get_item(Key=TAG_SHARDS_BACKFILLED_KEY)
+        except ClientError as e:
+            raise DatabaseError(f"Failed to read tag shards: {e}") from e
+        if not backfilled:
+            return self._backfill_tag_shards()
+
+        shards = self._collect_items(
+            self.table.query, {'KeyConditionExpression': Key('pk').eq(TAG_SHARDS_PK)}, "Failed to read tag shards"
+        )
+        tags = []
+        for shard in shards:
+            query_kwargs = {'KeyConditionExpression': Key('pk').eq(tag_shard(shard['sk']))}
+            tags.extend(self._collect(self.table.query, query_kwargs, f"Failed to query tags in shard '{shard['sk']}'"))
+        return tags
+
+    def _backfill_tag_shards(self):
+        # Runs once per table: counters written before the shard directory
+        # existed are only reachable by a scan.
+        scan_kwargs = {'FilterExpression': Attr('pk').begins_with(TAG_PREFIX)}
+        tags = self._collect(self.table.scan, scan_kwargs, "Failed to scan tags")
+        try:
+            with self.table.batch_writer() as batch:
+                for shard in {tag[:1] for tag, _ in tags}:
+                    batch.put_item(Item={'pk': TAG_SHARDS_PK, 'sk': shard})
+            self.table.put_item(Item=TAG_SHARDS_BACKFILLED_KEY)
+        except ClientError as e:
+            raise DatabaseError(f"Failed to record tag shards: {e}") from e
+        return tags
+
+    def _collect(self, operation, kwargs, error_message):
+        return [(item['sk'], int(item['count'])) for item in self._collect_items(operation, kwargs, error_message)]
+
+    def _collect_items(self, operation, kwargs, error_message):
+        items = []
+        try:
+            while True:
+                response = operation(**kwargs)
+                items.extend(response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    return items
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            raise DatabaseError(f"{error_message}: {e}") from e
+
+    def put_cached_page(self, content_type, start_key, items, last_evaluated_key, refreshed_at):
+        """Store one contentType result page for every container to read; False if it is too large."""
+        body = zlib.compress(json.dumps(
+            {'items': items, 'lastEvaluatedKey': last_evaluated_key}, default=_plain_number
+        ).encode('utf-8'))
+        if len(body) > MAX_SHARED_PAGE_BYTES:
+            return False
+        try:
+            self.table.put_item(Item={
+                'pk': f"{PAGE_PREFIX}{content_type}",
+                'sk': _page_sort_key(start_key),
+                'page': body,
+                'refreshedAt': refreshed_at,
+            })
+        except ClientError as e:
+            raise DatabaseError(f"Failed to store cached page for '{content_type}': {e}") from e
+        return True
+
+    def get_cached_page(self, content_type, start_key, max_age_seconds, now):
+        """(items, last evaluated key) from the shared page cache, or None if missing or older than max_age_seconds."""
+        try:
+            item = self.table.get_item(
+                Key={'pk': f"{PAGE_PREFIX}{content_type}", 'sk': _page_sort_key(start_key)}
+            ).get('Item')
+        except ClientError as e:
+            raise DatabaseError(f"Failed to get cached page for '{content_type}': {e}") from e
+        if not item or now - item['refreshedAt'] > max_age_seconds:
+            return None
+        page = json.loads(zlib.decompress(bytes(item['page'])))
+        return page['items'], page['lastEvaluatedKey']
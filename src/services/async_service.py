@@ -0,0 +1,33 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+ASYNC_SERVICE_WORKERS = int(os.environ.get("ASYNC_SERVICE_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=ASYNC_SERVICE_WORKERS, thread_name_prefix="aws")
+
+
+class AsyncService:
+    """Awaitable view of a blocking service with the same method names.
+
+    Each call runs the wrapped boto3-backed method on a shared thread pool, so
+    independent calls can be awaited together with asyncio.gather. Errors are
+    the service's own (S3Error, DatabaseError, ...).
+    """
+
+    def __init__(self, service, executor=None):
+        self._service = service
+        self._executor = executor or _executor
+
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(attr, *args, **kwargs))
+
+        call.__name__ = name
+        return call
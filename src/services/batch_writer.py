@@ -0,0 +1,139 @@
+import logging
+import random
+import threading
+import time
+from botocore.exceptions import ClientError
+from src.exceptions import BatchWriteError, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_ITEMS = 25
+
+
+class BatchWriter:
+    """Buffers puts and deletes for one table and writes them with BatchWriteItem.
+
+    A batch is sent as soon as 25 requests are queued, or `max_latency`
+    seconds after the first request entered an empty buffer, whichever is
+    first. Requests for a key that is already queued replace the queued one.
+    UnprocessedItems are retried with full-jitter exponential backoff.
+    A failed write raises BatchWriteError, whose `written` lists the key
+    tuples committed before it, so callers can undo only what did not land.
+
+    Use it as a context manager so the tail is flushed when the block ends:
+
+        with dynamodb_service.batch_writer() as writer:
+            for item in items:
+                writer.put_item(item)
+    """
+
+    def __init__(self, client, table_name, key_names=('imageId',), max_latency=0.05,
+                 max_attempts=8, base_delay=0.05, max_delay=2.0, on_write=None):
+        # A low-level client: the timer flushes from its own thread and
+        # clients are thread-safe where Table resources are not.
+        self._client = client
+        self._table_name = table_name
+        self._key_names = key_names
+        self._max_latency = max_latency
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._on_write = on_write
+
+        self._buffer = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._error = None
+        self._written = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def put_item(self, item):
+        self._add(item, {'PutRequest': {'Item': item}})
+
+    def delete_item(self, key):
+        self._add(key, {'DeleteRequest': {'Key': key}})
+
+    def flush(self):
+        self._drain()
+        self._raise_deferred()
+
+    def close(self):
+        self.flush()
+
+    def _add(self, item, request):
+        self._raise_deferred()
+        key = tuple(item[name] for name in self._key_names)
+        with self._lock:
+            self._buffer.pop(key, None)
+            self._buffer[key] = request
+            full = len(self._buffer) >= MAX_BATCH_ITEMS
+            if not full and self._timer is None and self._max_latency is not None:
+                self._timer = threading.Timer(self._max_latency, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self._drain()
+
+    def _drain(self):
+        # Taking the buffer and writing it under one lock keeps batches in
+        # queue order, so a later write to a key never lands before an
+        # earlier one.
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                requests = list(self._buffer.items())
+                self._buffer.clear()
+            try:
+                for start in range(0, len(requests), MAX_BATCH_ITEMS):
+                    self._write_batch(dict(requests[start:start + MAX_BATCH_ITEMS]))
+            finally:
+                if requests and self._on_write:
+                    self._on_write()
+
+    def _flush_on_timer(self):
+        try:
+            self._drain()
+        except DatabaseError as e:
+            # Surfaced to the caller on its next put, delete or flush.
+            logger.error(f"Timed flush failed: {e}")
+            self._error = e
+
+    def _raise_deferred(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _key(self, request):
+        attributes = request['PutRequest']['Item'] if 'PutRequest' in request else request['DeleteRequest']['Key']
+        return tuple(attributes[name] for name in self._key_names)
+
+    def _write_batch(self, requests):
+        # requests maps key tuples to requests; whatever is left in it when
+        # this fails was not written.
+        for attempt in range(self._max_attempts):
+            try:
+                response = self._client.batch_write_item(RequestItems={self._table_name: list(requests.values())})
+            except ClientError as e:
+                raise BatchWriteError(
+                    f"Failed to batch write {len(requests)} items to DynamoDB: {e}", self._written
+                ) from e
+            unprocessed = (response.get('UnprocessedItems') or {}).get(self._table_name, [])
+            unprocessed_keys = {self._key(request) for request in unprocessed}
+            self._written.extend(key for key in requests if key not in unprocessed_keys)
+            requests = {key: request for key, request in requests.items() if key in unprocessed_keys}
+            if not requests:
+                return
+            delay = random.uniform(0, min(self._max_delay, self._base_delay * 2 ** attempt))
+            logger.warning(f"{len(requests)} items unprocessed, retrying in {delay:.3f}s")
+            time.sleep(delay)
+        raise BatchWriteError(
+            f"{len(requests)} items still unprocessed after {self._max_attempts} attempts.", self._written
+        )
@@ -1,12 +1,21 @@
 import boto3
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
 from src.config import config
 from src.exceptions import DatabaseError, ImageNotFoundError
+from src.models.image_metadata import hash_bucket, owner_shards
+from src.services.batch_writer import BatchWriter
+from src.utils.page_cache import content_type_pages
+from src.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
+
+
+def _freeze(key):
+    return tuple(sorted(key.items())) if key else None
  
  
 class DynamoDBService:
@@ -28,14 +37,37 @@ class DynamoDBService:
 
             self.dynamodb_resource = boto3.resource("dynamodb", **boto_kwargs)
         self.table = self.dynamodb_resource.Table(self.table_name)
+        self._flight = SingleFlight()
+
+    def _coalesced(self, key, fn):
+        """Run a read once for all threads in this container asking for the same key at the same time."""
+        try:
+            return self._flight.do(key, fn, timeout=config.SINGLE_FLIGHT_TIMEOUT_SECONDS)
+        except TimeoutError as e:
+            raise DatabaseError(str(e)) from e
 
     def put_item(self, item):
         try:
             return self.table.put_item(Item=item)
         except ClientError as e:
             raise DatabaseError(f"Failed to put item in DynamoDB: {e}") from e
+        finally:
+            # After the write, so a concurrent read cannot re-cache the old page.
+            content_type_pages.invalidate()
+
+    def batch_writer(self, **kwargs):
+        """A BatchWriter for this table; see src.services.batch_writer."""
+        return BatchWriter(self.table.meta.client, self.table_name, on_write=content_type_pages.invalidate, **kwargs)
+
+    def batch_put_items(self, items):
+        with self.batch_writer(max_latency=None) as writer:
+            for item in items:
+                writer.put_item(item)
 
     def get_item(self, image_id):
+        return self._coalesced(('get_item', image_id), lambda: self._get_item(image_id))
+
+    def _get_item(self, image_id):
         try:
             response = self.table.get_item(Key={'imageId': image_id})
             item = response.get('Item')
@@ -45,13 +77,60 @@ class DynamoDBService:
         except ClientError as e:
             raise DatabaseError(f"Failed to get item '{image_id}' from DynamoDB: {e}") from e
 
+    def update_item(self, image_id, attributes):
+        names = {f'#a{i}': name for i, name in enumerate(attributes)}
+        values = {f':v{i}': value for i, value in enumerate(attributes.values())}
+        try:
+            return self.table.update_item(
+                Key={'imageId': image_id},
+                UpdateExpression='SET ' + ', '.join(f'#a{i} = :v{i}' for i in range(len(attributes))),
+                ConditionExpression=Attr('imageId').exists(),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                raise ImageNotFoundError(f"Image with ID '{image_id}' not found.") from e
+            raise DatabaseError(f"Failed to update item '{image_id}' in DynamoDB: {e}") from e
+        finally:
+            content_type_pages.invalidate()
+
+    def record_access(self, image_id, reads, timestamp):
+        try:
+            return self.table.update_item(
+                Key={'imageId': image_id},
+                UpdateExpression='ADD readCount :reads SET lastAccessed = :timestamp',
+                ConditionExpression=Attr('imageId').exists(),
+                ExpressionAttributeValues={':reads': reads, ':timestamp': timestamp},
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                raise ImageNotFoundError(f"Image with ID '{image_id}' not found.") from e
+            raise DatabaseError(f"Failed to record access to '{image_id}' in DynamoDB: {e}") from e
+
     def delete_item(self, image_id):
+        """Delete a row, raising ImageNotFoundError if it was already gone.
+
+        Only the caller that actually removed the row gets a result, so only
+        it should count the image out of the aggregates.
+        """
         try:
-            return self.table.delete_item(Key={'imageId': image_id})
+            return self.table.delete_item(
+                Key={'imageId': image_id},
+                ConditionExpression=Attr('imageId').exists(),
+            )
         except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                raise ImageNotFoundError(f"Image with ID '{image_id}' not found.") from e
             raise DatabaseError(f"Failed to delete item '{image_id}' from DynamoDB: {e}") from e
+        finally:
+            content_type_pages.invalidate()
 
     def query_by_content_type(self, content_type, exclusive_start_key=None):
+        return self._coalesced(('query_by_content_type', content_type, _freeze(exclusive_start_key)),
+                               lambda: self._query_by_content_type(content_type, exclusive_start_key))
+
+    def _query_by_content_type(self, content_type, exclusive_start_key=None):
         query_kwargs = {
             'IndexName': 'ContentTypeIndex',
             'KeyConditionExpression': Key('contentType').eq(content_type)
@@ -66,6 +145,10 @@ class DynamoDBService:
             raise DatabaseError(f"Failed to query by contentType '{content_type}': {e}") from e
 
     def query_by_tag(self, tag, exclusive_start_key=None):
+        return self._coalesced(('query_by_tag', tag, _freeze(exclusive_start_key)),
+                               lambda: self._query_by_tag(tag, exclusive_start_key))
+
+    def _query_by_tag(self, tag, exclusive_start_key=None):
         scan_kwargs = {
             'FilterExpression': Attr('tags').contains(tag)
         }
@@ -78,7 +161,68 @@ class DynamoDBService:
         except ClientError as e:
             raise DatabaseError(f"Failed to query by tag '{tag}': {e}") from e
 
+    def query_by_owner(self, owner, exclusive_start_key=None, content_type=None, tag=None, page_size=50):
+        return self._coalesced(('query_by_owner', owner, _freeze(exclusive_start_key), content_type, tag, page_size),
+                               lambda: self._query_by_owner(owner, exclusive_start_key, content_type, tag, page_size))
+
+    def _query_by_owner(self, owner, exclusive_start_key, content_type, tag, page_size):
+        """One owner's images, newest first, optionally filtered by contentType and/or tag.
+
+        Queries every OwnerIndex shard in parallel and merges them. A page
+        only goes as far down as every shard has been read, and the returned
+        key ({'ownerSortKey': ...}) resumes all shards below it.
+        """
+        client = self.table.meta.client
+        query_kwargs = {
+            'TableName': self.table_name,
+            'IndexName': 'OwnerIndex',
+            'KeyConditionExpression': 'ownerShard = :shard',
+            'ExpressionAttributeValues': {},
+            'ScanIndexForward': False,
+            'Limit': page_size,
+        }
+        if exclusive_start_key:
+            query_kwargs['KeyConditionExpression'] += ' AND ownerSortKey < :before'
+            query_kwargs['ExpressionAttributeValues'][':before'] = exclusive_start_key['ownerSortKey']
+        filters = []
+        if content_type:
+            filters.append('contentType = :contentType')
+            query_kwargs['ExpressionAttributeValues'][':contentType'] = content_type
+        if tag:
+            filters.append('contains(tags, :tag)')
+            query_kwargs['ExpressionAttributeValues'][':tag'] = tag
+        if filters:
+            query_kwargs['FilterExpression'] = ' AND '.join(filters)
+
+        def query_shard(shard):
+            kwargs = {**query_kwargs, 'ExpressionAttributeValues': {**query_kwargs['ExpressionAttributeValues'], ':shard': shard}}
+            return client.query(**kwargs)
+
+        try:
+            shards = owner_shards(owner)
+            with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+                responses = list(pool.map(query_shard, shards))
+        except ClientError as e:
+            raise DatabaseError(f"Failed to query images of owner '{owner}': {e}") from e
+
+        # Below the highest key a truncated shard stopped at, that shard may
+        # hold rows not read yet.
+        frontier = max((r['LastEvaluatedKey']['ownerSortKey'] for r in responses if 'LastEvaluatedKey' in r), default=None)
+        items = sorted((item for r in responses for item in r.get('Items', [])),
+                       key=lambda item: item['ownerSortKey'], reverse=True)
+        if frontier is not None:
+            items = [item for item in items if item['ownerSortKey'] >= frontier]
+
+        if len(items) > page_size:
+            items = items[:page_size]
+            return items, {'ownerSortKey': items[-1]['ownerSortKey']}
+        return items, {'ownerSortKey': frontier} if frontier is not None else None
+
     def scan_items(self, exclusive_start_key: dict = None):
+        return self._coalesced(('scan_items', _freeze(exclusive_start_key)),
+                               lambda: self._scan_items(exclusive_start_key))
+
+    def _scan_items(self, exclusive_start_key: dict = None):
         scan_kwargs = {}
         if exclusive_start_key:
             scan_kwargs['ExclusiveStartKey'] = exclusive_start_key
@@ -88,3 +232,90 @@ class DynamoDBService:
             return response.get('Items', []), response.get('LastEvaluatedKey') # pragma: no cover
         except ClientError as e:
             raise DatabaseError(f"Failed to scan table: {e}") from e
+
+    def scan_hashes(self):
+        """Every hashed row. A full-table Scan: only the snapshot job should call this."""
+        scan_kwargs = {
+            'ProjectionExpression': 'imageId, phash, processedTimestamp',
+            'FilterExpression': Attr('phash').exists(),
+        }
+
+        try:
+            while True:
+                response = self.table.scan(**scan_kwargs)
+                yield from response.get('Items', [])
+                if 'LastEvaluatedKey' not in response:
+                    return
+                scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            raise DatabaseError(f"Failed to scan perceptual hashes: {e}") from e
+
+    def query_hashes_since(self, since_timestamp, until_timestamp):
+        """Rows hashed at or after since_timestamp, one HashIndex Query per hour bucket.
+
+        Only the buckets up to until_timestamp are read, so the cost follows the
+        number of new hashes rather than the size of the table.
+        """
+        try:
+            for bucket in range(hash_bucket(since_timestamp), hash_bucket(until_timestamp) + 1):
+                query_kwargs = {
+                    'IndexName': 'HashIndex',
+                    'KeyConditionExpression': Key('hashBucket').eq(bucket) & Key('processedTimestamp').gte(since_timestamp),
+                    'ProjectionExpression': 'imageId, phash, processedTimestamp',
+                }
+                while True:
+                    response = self.table.query(**query_kwargs)
+                    yield from response.get('Items', [])
+                    if 'LastEvaluatedKey' not in response:
+                        break
+                    query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            raise DatabaseError(f"Failed to query perceptual hashes: {e}") from e
+
+    def scan_tiering_candidates(self, cutoff_timestamp):
+        """Rows never assigned a storage class whose last recorded read (or upload) is before the cutoff."""
+        not_read_since = Attr('lastAccessed').lt(cutoff_timestamp) | (
+            Attr('lastAccessed').not_exists() & Attr('uploadTimestamp').lt(cutoff_timestamp)
+        )
+        scan_kwargs = {
+            'ProjectionExpression': 'imageId, s3_key, lastAccessed, uploadTimestamp',
+            'FilterExpression': Attr('storageClass').not_exists() & not_read_since,
+        }
+
+        try:
+            while True:
+                response = self.table.scan(**scan_kwargs)
+                yield from response.get('Items', [])
+                if 'LastEvaluatedKey' not in response:
+                    return
+                scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            raise DatabaseError(f"Failed to scan for tiering candidates: {e}") from e
+
+    def count_items(self, content_type=None, tag=None, total_segments=4):
+        """Count rows with a parallel Select=COUNT scan; reads the whole table."""
+        # Segments run on the low-level client: clients are thread-safe, Table resources are not.
+        client = self.table.meta.client
+        scan_kwargs = {'TableName': self.table_name, 'Select': 'COUNT', 'TotalSegments': total_segments}
+        if content_type:
+            scan_kwargs['FilterExpression'] = 'contentType = :value'
+            scan_kwargs['ExpressionAttributeValues'] = {':value': content_type}
+        elif tag:
+            scan_kwargs['FilterExpression'] = 'contains(tags, :value)'
+            scan_kwargs['ExpressionAttributeValues'] = {':value': tag}
+
+        def count_segment(segment):
+            kwargs = {**scan_kwargs, 'Segment': segment}
+            count = 0
+            while True:
+                response = client.scan(**kwargs)
+                count += response['Count']
+                if 'LastEvaluatedKey' not in response:
+                    return count
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        try:
+            with ThreadPoolExecutor(max_workers=total_segments) as pool:
+                return sum(pool.map(count_segment, range(total_segments)))
+        except ClientError as e:
+            raise DatabaseError(f"Failed to count items: {e}") from e
@@ -1,9 +1,12 @@
 import boto3
 import os
 from src.config import config
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from src.exceptions import S3Error
 
+SINGLE_COPY_CONFIG = TransferConfig(multipart_threshold=5 * 1024 ** 3)
+
 
 class S3Service:
     def __init__(self, s3_client=None): # pragma: no cover
@@ -34,6 +37,30 @@ class S3Service:
         except ClientError as e:
             raise S3Error(f"Failed to upload {object_name} to S3: {e}") from e
     
+    def get_file(self, object_name):
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=object_name)
+            return response['Body'].read()
+        except ClientError as e:
+            raise S3Error(f"Failed to download {object_name} from S3: {e}") from e
+
+    def head_file(self, object_name):
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=object_name)
+            return response['ContentLength'], response.get('ContentType', 'application/octet-stream')
+        except ClientError as e:
+            raise S3Error(f"Failed to read attributes of {object_name} from S3: {e}") from e
+
+    def iter_file_range(self, object_name, start, end, chunk_size=64 * 1024):
+        """Yield bytes start..end (inclusive) of an object in chunks without reading it all."""
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.bucket_name, Key=object_name, Range=f"bytes={start}-{end}"
+            )
+            yield from response['Body'].iter_chunks(chunk_size)
+        except ClientError as e:
+            raise S3Error(f"Failed to download {object_name} from S3: {e}") from e
+
     def get_file_url(self, object_name):
         try:
             url = self.s3_client.generate_presigned_url(
@@ -48,6 +75,21 @@ class S3Service:
 
         return url
 
+    def set_storage_class(self, object_name, storage_class):
+        """Rewrite an object in place under another storage class, keeping its metadata."""
+        source = {'Bucket': self.bucket_name, 'Key': object_name}
+        try:
+            # A multipart copy would emit ObjectCreated:CompleteMultipartUpload,
+            # which process_image subscribes to, so stay on a single CopyObject
+            # up to its 5 GB limit.
+            self.s3_client.copy(
+                source, self.bucket_name, object_name,
+                ExtraArgs={'StorageClass': storage_class, 'MetadataDirective': 'COPY'},
+                Config=SINGLE_COPY_CONFIG,
+            )
+        except ClientError as e:
+            raise S3Error(f"Failed to move {object_name} to {storage_class}: {e}") from e
+
     def delete_file(self, object_name):
         try:
             return self.s3_client.delete_object(Bucket=self.bucket_name, Key=object_name)
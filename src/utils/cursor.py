@@ -0,0 +1,107 @@
+"""Compact, signed pagination cursors.
+
+A cursor is base64url(payload + mac) where payload is
+
+    version:u8  access path:u8  expires at:u32 (0 = never)  value count:u8
+    then per key value  type:u8 ('S' or 'N')  length:u16  utf-8 bytes
+
+and mac is a truncated HMAC-SHA256 over the payload and the request's filter
+value. Key attribute names are implied by the access path, so they are not
+stored, and a cursor only verifies for the access path and filter it was
+issued for.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import secrets
+import struct
+import time
+from decimal import Decimal
+from src.config import config
+from src.exceptions import InvalidCursorError
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+MAC_BYTES = 16
+
+# Access path -> (code, key attributes in LastEvaluatedKey order).
+ACCESS_PATHS = {
+    'scan': (1, ('imageId',)),
+    'contentType': (2, ('imageId', 'contentType')),
+    'tags': (3, ('imageId',)),
+    'owner': (4, ('ownerSortKey',)),
+}
+
+_HEADER = struct.Struct('>BBIB')
+_VALUE_HEADER = struct.Struct('>cH')
+
+_secret = None
+
+
+def _signing_key():
+    global _secret
+    if _secret is None:
+        if config.CURSOR_SECRET:
+            _secret = config.CURSOR_SECRET.encode('utf-8')
+        else:
+            logger.warning("CURSOR_SECRET not set; cursors will only be valid in this container.")
+            _secret = secrets.token_bytes(32)
+    return _secret
+
+
+def _mac(payload, filter_value):
+    message = payload + b'\x00' + (filter_value or '').encode('utf-8')
+    return hmac.new(_signing_key(), message, hashlib.sha256).digest()[:MAC_BYTES]
+
+
+def encode_cursor(access_path, last_evaluated_key, filter_value=None, ttl_seconds=None):
+    code, attributes = ACCESS_PATHS[access_path]
+    if set(last_evaluated_key) != set(attributes):
+        raise ValueError(f"Key {sorted(last_evaluated_key)} does not match access path '{access_path}'.")
+
+    ttl_seconds = config.CURSOR_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    expires_at = int(time.time()) + ttl_seconds if ttl_seconds else 0
+
+    parts = [_HEADER.pack(VERSION, code, expires_at, len(attributes))]
+    for name in attributes:
+        value = last_evaluated_key[name]
+        kind = b'N' if isinstance(value, (int, Decimal)) else b'S'
+        data = str(value).encode('utf-8')
+        parts.append(_VALUE_HEADER.pack(kind, len(data)) + data)
+    payload = b''.join(parts)
+    return base64.urlsafe_b64encode(payload + _mac(payload, filter_value)).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token, access_path, filter_value=None):
+    """Verify a cursor for this access path and filter and return its ExclusiveStartKey."""
+    try:
+        raw = base64.b64decode(token + '=' * (-len(token) % 4), altchars=b'-_', validate=True)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise InvalidCursorError("Cursor is not valid base64.") from e
+    if len(raw) < _HEADER.size + MAC_BYTES:
+        raise InvalidCursorError("Cursor is truncated.")
+
+    payload, mac = raw[:-MAC_BYTES], raw[-MAC_BYTES:]
+    if not hmac.compare_digest(mac, _mac(payload, filter_value)):
+        raise InvalidCursorError("Cursor signature does not match.")
+
+    version, code, expires_at, count = _HEADER.unpack_from(payload)
+    expected_code, attributes = ACCESS_PATHS[access_path]
+    if version != VERSION:
+        raise InvalidCursorError(f"Unsupported cursor version {version}.")
+    if code != expected_code or count != len(attributes):
+        raise InvalidCursorError(f"Cursor was not issued for '{access_path}'.")
+    if expires_at and expires_at < time.time():
+        raise InvalidCursorError("Cursor has expired.")
+
+    key, offset = {}, _HEADER.size
+    for name in attributes:
+        kind, length = _VALUE_HEADER.unpack_from(payload, offset)
+        offset += _VALUE_HEADER.size
+        text = payload[offset:offset + length].decode('utf-8')
+        offset += length
+        key[name] = (int(text) if text.lstrip('-').isdigit() else Decimal(text)) if kind == b'N' else text
+    return key
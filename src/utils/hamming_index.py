@@ -0,0 +1,137 @@
+import numpy as np
+
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# Above this many probes per chunk a vectorised linear scan is cheaper than
+# enumerating neighbouring chunk values.
+MAX_PROBES_PER_CHUNK = 200
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(values):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT8[values.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+def _neighbours(value, radius):
+    """All CHUNK_BITS-bit values within Hamming distance `radius` of `value`."""
+    frontier = {value}
+    seen = {value}
+    for _ in range(radius):
+        frontier = {v ^ (1 << bit) for v in frontier for bit in range(CHUNK_BITS)} - seen
+        seen |= frontier
+    return np.fromiter(seen, dtype=np.uint64, count=len(seen))
+
+
+def _probe_count(radius):
+    count, term = 1, 1
+    for r in range(1, radius + 1):
+        term = term * (CHUNK_BITS - r + 1) // r
+        count += term
+    return count
+
+
+class HammingIndex:
+    """In-memory index of 64-bit hashes answering "everything within distance k".
+
+    Hashes live in one packed uint64 array. Lookups use multi-index hashing: the
+    hash is split into CHUNKS 16-bit substrings, and by the pigeonhole principle
+    any hash within distance k of the query matches it in at least one substring
+    to within k // CHUNKS bits, so only those candidates are verified.
+    """
+
+    def __init__(self):
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._live = np.empty(0, dtype=bool)
+        self._ids = []
+        self._positions = {}
+        self._pending = {}
+        self._sorted_chunks = None
+        self._chunk_order = None
+
+    @classmethod
+    def from_arrays(cls, ids, hashes):
+        """Build an index from distinct ids and their hashes without per-item inserts."""
+        index = cls()
+        index._ids = list(ids)
+        index._hashes = np.asarray(hashes, dtype=np.uint64)
+        index._live = np.ones(len(index._ids), dtype=bool)
+        index._positions = {item_id: position for position, item_id in enumerate(index._ids)}
+        return index
+
+    def __len__(self):
+        self._compact()
+        return int(self._live.sum())
+
+    def add(self, item_id, value):
+        """Insert or replace the hash stored for item_id."""
+        self.remove(item_id)
+        self._pending[item_id] = value
+
+    def remove(self, item_id):
+        if item_id in self._positions:
+            self._live[self._positions.pop(item_id)] = False
+            return
+        self._pending.pop(item_id, None)
+
+    def _compact(self):
+        if not self._pending:
+            return
+        start = len(self._ids)
+        pending = np.fromiter(self._pending.values(), dtype=np.uint64, count=len(self._pending))
+        self._hashes = np.concatenate([self._hashes, pending])
+        self._live = np.concatenate([self._live, np.ones(len(pending), dtype=bool)])
+        for offset, item_id in enumerate(self._pending):
+            self._positions[item_id] = start + offset
+        self._ids.extend(self._pending)
+        self._pending = {}
+        self._sorted_chunks = None
+
+    def _chunk_tables(self):
+        if self._sorted_chunks is None:
+            self._sorted_chunks, self._chunk_order = [], []
+            for chunk in range(CHUNKS):
+                values = (self._hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(CHUNK_MASK)
+                order = np.argsort(values, kind="stable")
+                self._sorted_chunks.append(values[order])
+                self._chunk_order.append(order)
+        return self._sorted_chunks, self._chunk_order
+
+    def _candidates(self, query, radius):
+        sorted_chunks, chunk_order = self._chunk_tables()
+        found = []
+        for chunk in range(CHUNKS):
+            probes = _neighbours((query >> (chunk * CHUNK_BITS)) & CHUNK_MASK, radius)
+            lo = np.searchsorted(sorted_chunks[chunk], probes, side="left")
+            hi = np.searchsorted(sorted_chunks[chunk], probes, side="right")
+            for start, stop in zip(lo[hi > lo], hi[hi > lo]):
+                found.append(chunk_order[chunk][start:stop])
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(found))
+
+    def search(self, query, max_distance, limit=None):
+        """Return [(item_id, distance)] within max_distance of query, closest first."""
+        self._compact()
+        if not self._ids:
+            return []
+
+        radius = max_distance // CHUNKS
+        if _probe_count(radius) > MAX_PROBES_PER_CHUNK:
+            positions = np.arange(len(self._ids))
+        else:
+            positions = self._candidates(query, radius)
+
+        positions = positions[self._live[positions]]
+        distances = popcount(self._hashes[positions] ^ np.uint64(query))
+        keep = distances <= max_distance
+        positions, distances = positions[keep], distances[keep]
+
+        order = np.argsort(distances, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return [(self._ids[p], int(d)) for p, d in zip(positions[order], distances[order])]
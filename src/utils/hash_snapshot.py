@@ -0,0 +1,44 @@
+"""Packed perceptual-hash snapshots for the similarity index.
+
+A snapshot is
+
+    magic:4s  watermark:u64  count:u32
+    count big-endian u64 hashes
+    count image IDs, utf-8, joined by newlines
+
+where watermark is the processedTimestamp from which HashIndex must be
+queried to bring the snapshot up to date.
+"""
+import struct
+import numpy as np
+
+SNAPSHOT_KEY = "index/phash-snapshot.bin"
+
+MAGIC = b"PHS1"
+_HEADER = struct.Struct(">4sQI")
+
+
+def pack_snapshot(ids, hashes, watermark):
+    hashes = np.asarray(hashes, dtype=">u8")
+    if len(ids) != len(hashes):
+        raise ValueError("Every image ID needs exactly one hash.")
+    return b"".join([
+        _HEADER.pack(MAGIC, watermark, len(ids)),
+        hashes.tobytes(),
+        "\n".join(ids).encode("utf-8"),
+    ])
+
+
+def unpack_snapshot(data):
+    """Return (ids, hashes as a uint64 array, watermark)."""
+    if len(data) < _HEADER.size:
+        raise ValueError("Snapshot is truncated.")
+    magic, watermark, count = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a perceptual-hash snapshot.")
+    end = _HEADER.size + 8 * count
+    hashes = np.frombuffer(data, dtype=">u8", count=count, offset=_HEADER.size).astype(np.uint64)
+    ids = data[end:].decode("utf-8").split("\n") if count else []
+    if len(ids) != count:
+        raise ValueError("Snapshot is truncated.")
+    return ids, hashes, watermark
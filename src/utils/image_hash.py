@@ -0,0 +1,37 @@
+from io import BytesIO
+from src.exceptions import InvalidRequestError
+
+HASH_SIZE = 8
+
+
+def dhash(image_bytes):
+    """64-bit difference hash: one bit per horizontally adjacent pixel pair of a 9x8 greyscale thumbnail."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            image.draft("L", (HASH_SIZE * 4, HASH_SIZE * 4))
+            pixels = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).tobytes()
+    except (UnidentifiedImageError, OSError) as e:
+        raise InvalidRequestError(f"Cannot compute a perceptual hash: {e}") from e
+
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def format_hash(value):
+    return f"{value:016x}"
+
+
+def parse_hash(text):
+    try:
+        value = int(text, 16)
+    except (TypeError, ValueError) as e:
+        raise InvalidRequestError(f"Invalid perceptual hash '{text}'.") from e
+    if len(text) > 16 or value < 0:
+        raise InvalidRequestError(f"Invalid perceptual hash '{text}'.")
+    return value
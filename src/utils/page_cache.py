@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+CONTENT_TYPE_CACHE_TTL_SECONDS = float(os.environ.get("CONTENT_TYPE_CACHE_TTL_SECONDS", "10"))
+CONTENT_TYPE_CACHE_PAGES = int(os.environ.get("CONTENT_TYPE_CACHE_PAGES", "3"))
+
+
+def _freeze(key):
+    return tuple(sorted(key.items())) if key else None
+
+
+class PageCache:
+    """In-container cache of the first `max_pages` result pages per filter value.
+
+    Page 0 is the page without a start key; page n+1 is the one that starts at
+    page n's LastEvaluatedKey. Deeper pages are never cached. Entries expire
+    after `ttl` seconds and invalidate() drops everything.
+    """
+
+    def __init__(self, ttl, max_pages):
+        self._ttl = ttl
+        self._max_pages = max_pages
+        # (filter value, frozen start key) -> (items, last evaluated key, page number, loaded_at)
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        """Read before fetching a page and pass to put(), so a page read before
+        a concurrent write is not cached after that write invalidated the cache."""
+        return self._generation
+
+    def get(self, filter_value, start_key):
+        with self._lock:
+            entry = self._pages.get((filter_value, _freeze(start_key)))
+            if entry is None or time.monotonic() - entry[3] >= self._ttl:
+                return None
+            return entry[0], entry[1]
+
+    def put(self, filter_value, start_key, items, last_evaluated_key, generation=None):
+        if self._max_pages <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if start_key is None:
+                page = 0
+            else:
+                previous = next((entry for (value, _), entry in self._pages.items()
+                                 if value == filter_value and entry[1] == start_key), None)
+                if previous is None:
+                    return
+                page = previous[2] + 1
+            if page < self._max_pages:
+                self._pages[(filter_value, _freeze(start_key))] = (items, last_evaluated_key, page, time.monotonic())
+
+    def invalidate(self):
+        with self._lock:
+            self._pages.clear()
+            self._generation += 1
+
+
+# First pages of GET /images?contentType=..., shared by every handler in the
+# container. DynamoDBService writes invalidate it.
+content_type_pages = PageCache(CONTENT_TYPE_CACHE_TTL_SECONDS, CONTENT_TYPE_CACHE_PAGES)
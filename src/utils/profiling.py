@@ -0,0 +1,123 @@
+"""Opt-in per-invocation profiling for Lambda handlers.
+
+Set PROFILE_SAMPLE_RATE (0-1) to profile that fraction of invocations, or
+PROFILE_ENABLED=1 for all of them. A profiled invocation writes two files
+named '<handler module>-<epoch ms>-<request id>':
+
+- '.prof': cProfile stats, readable with pstats or snakeviz
+- '.mem.txt': the top tracemalloc allocations made during the invocation
+
+PROFILE_OUTPUT is a local directory (default /tmp/profiles) or an
+'s3://bucket/prefix/' location.
+"""
+import cProfile
+import io
+import linecache
+import logging
+import marshal
+import os
+import random
+import threading
+import time
+import tracemalloc
+from functools import wraps
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_OUTPUT = os.environ.get("PROFILE_OUTPUT", "/tmp/profiles")
+PROFILE_TOP_ALLOCATIONS = int(os.environ.get("PROFILE_TOP_ALLOCATIONS", "25"))
+
+# cProfile and tracemalloc are process-wide, so only one invocation is
+# profiled at a time; concurrent ones (router, dev server) run unprofiled.
+_profiling = threading.Lock()
+_s3_client = None
+
+
+def _should_profile():
+    return PROFILE_ENABLED or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+
+def format_allocations(snapshot, limit):
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, linecache.__file__),
+    ])
+    stats = snapshot.statistics('lineno')
+    out = io.StringIO()
+    out.write(f"Top {min(limit, len(stats))} of {len(stats)} allocation sites, "
+              f"{sum(s.size for s in stats) / 1024:.1f} KiB total\n")
+    for index, stat in enumerate(stats[:limit], 1):
+        frame = stat.traceback[0]
+        out.write(f"#{index}: {frame.filename}:{frame.lineno}: {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+        line = linecache.getline(frame.filename, frame.lineno).strip()
+        if line:
+            out.write(f"    {line}\n")
+    return out.getvalue()
+
+
+def _write(name, data):
+    if PROFILE_OUTPUT.startswith("s3://"):
+        global _s3_client
+        if _s3_client is None:
+            import boto3
+            kwargs = {"region_name": config.AWS_REGION, **config.BOTO3_CREDENTIALS}
+            if config.S3_ENDPOINT_URL:
+                kwargs["endpoint_url"] = config.S3_ENDPOINT_URL
+            _s3_client = boto3.client("s3", **kwargs)
+        bucket, _, prefix = PROFILE_OUTPUT[len("s3://"):].partition("/")
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+        _s3_client.put_object(Bucket=bucket, Key=f"{prefix}{name}", Body=data)
+        return f"s3://{bucket}/{prefix}{name}"
+
+    os.makedirs(PROFILE_OUTPUT, exist_ok=True)
+    path = os.path.join(PROFILE_OUTPUT, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _save(func, context, profiler, snapshot):
+    request_id = getattr(context, "aws_request_id", None)
+    name = f"{func.__module__.rsplit('.', 1)[-1]}-{int(time.time() * 1000)}"
+    if isinstance(request_id, str):
+        name += f"-{request_id}"
+    profiler.create_stats()
+    # The same bytes Profile.dump_stats writes, without needing a local file.
+    written = [
+        _write(f"{name}.prof", marshal.dumps(profiler.stats)),
+        _write(f"{name}.mem.txt", format_allocations(snapshot, PROFILE_TOP_ALLOCATIONS).encode("utf-8")),
+    ]
+    logger.info(f"Profile written to {', '.join(written)}")
+
+
+def profiled(func):
+    """Profile sampled invocations of a Lambda handler; see the module docstring."""
+    @wraps(func)
+    def wrapper(event, context, *args, **kwargs):
+        if not _should_profile() or not _profiling.acquire(blocking=False):
+            return func(event, context, *args, **kwargs)
+
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                return func(event, context, *args, **kwargs)
+            finally:
+                profiler.disable()
+                snapshot = tracemalloc.take_snapshot()
+                if started_tracemalloc:
+                    tracemalloc.stop()
+                try:
+                    _save(func, context, profiler, snapshot)
+                except Exception as e:
+                    logger.error(f"Failed to write profile: {e}")
+        finally:
+            _profiling.release()
+    return wrapper
@@ -0,0 +1,62 @@
+import copy
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for it and get a deep copy of its result, or its exception
+    re-raised. Nothing is cached once the call finishes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight call {key!r}.")
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+                waiters = call.waiters
+            # Snapshot before handing the original back, so waiters copy a
+            # value the leader's caller cannot be mutating underneath them.
+            if waiters and call.error is None:
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
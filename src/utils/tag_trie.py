@@ -0,0 +1,41 @@
+import heapq
+
+
+class _Node:
+    __slots__ = ('children', 'count')
+
+    def __init__(self):
+        self.children = {}
+        self.count = 0
+
+
+class TagTrie:
+    """Prefix tree of tag -> count used to serve autocomplete from memory."""
+
+    def __init__(self, tags=()):
+        self._root = _Node()
+        for tag, count in tags:
+            self.insert(tag, count)
+
+    def insert(self, tag, count):
+        node = self._root
+        for char in tag:
+            node = node.children.setdefault(char, _Node())
+        node.count = count
+
+    def complete(self, prefix, limit):
+        """The `limit` most used tags starting with prefix, as (tag, count) pairs."""
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        matches = []
+        stack = [(prefix, node)]
+        while stack:
+            tag, node = stack.pop()
+            if node.count > 0:
+                matches.append((tag, node.count))
+            stack.extend((tag + char, child) for char, child in node.children.items())
+        return heapq.nsmallest(limit, matches, key=lambda m: (-m[1], m[0]))
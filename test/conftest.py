@@ -18,10 +18,12 @@ def set_env_vars():
     """Set common environment variables for Lambda functions."""
     os.environ["IMAGE_BUCKET_NAME"] = "test-image-bucket"
     os.environ["METADATA_TABLE_NAME"] = "test-metadata-table"
+    os.environ["AGGREGATES_TABLE_NAME"] = "test-aggregates-table"
     os.environ["APP_ENV"] = "prod" # Default to prod for most tests
     yield
     del os.environ["IMAGE_BUCKET_NAME"]
     del os.environ["METADATA_TABLE_NAME"]
+    os.environ.pop("AGGREGATES_TABLE_NAME", None)
     del os.environ["APP_ENV"]
     if "LOCALSTACK_HOSTNAME" in os.environ:
         del os.environ["LOCALSTACK_HOSTNAME"]
@@ -53,6 +55,10 @@ def mocked_dynamodb(aws_credentials, set_env_vars):
                 {"AttributeName": "imageId", "AttributeType": "S"},
                 {"AttributeName": "contentType", "AttributeType": "S"},
                 {"AttributeName": "tags", "AttributeType": "S"},
+                {"AttributeName": "ownerShard", "AttributeType": "S"},
+                {"AttributeName": "ownerSortKey", "AttributeType": "S"},
+                {"AttributeName": "hashBucket", "AttributeType": "N"},
+                {"AttributeName": "processedTimestamp", "AttributeType": "N"},
             ],
             BillingMode="PAY_PER_REQUEST",
             GlobalSecondaryIndexes=[
@@ -68,7 +74,42 @@ def mocked_dynamodb(aws_credentials, set_env_vars):
                         {"AttributeName": "imageId", "KeyType": "RANGE"},
                     ],
                     "Projection": {"ProjectionType": "ALL"},
+                },
+                {
+                    "IndexName": "OwnerIndex",
+                    "KeySchema": [
+                        {"AttributeName": "ownerShard", "KeyType": "HASH"},
+                        {"AttributeName": "ownerSortKey", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+                {
+                    "IndexName": "HashIndex",
+                    "KeySchema": [
+                        {"AttributeName": "hashBucket", "KeyType": "HASH"},
+                        {"AttributeName": "processedTimestamp", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["phash"]},
                 }
             ],
         )
-        yield conn
\ No newline at end of file
+        yield conn
+
+@pytest.fixture(scope="function")
+def mocked_aggregates(aws_credentials, set_env_vars):
+    """Mocked DynamoDB resource with the aggregates table."""
+    with mock_aws():
+        conn = boto3.resource("dynamodb", region_name="us-east-1")
+        conn.create_table(
+            TableName=os.environ["AGGREGATES_TABLE_NAME"],
+            KeySchema=[
+                {"AttributeName": "pk", "KeyType": "HASH"},
+                {"AttributeName": "sk", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "pk", "AttributeType": "S"},
+                {"AttributeName": "sk", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield conn
@@ -0,0 +1,116 @@
+import pytest
+import os
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from src.services.aggregates_service import AggregatesService
+from src.exceptions import DatabaseError
+
+
+@pytest.fixture
+def aggregates_service_instance(mocked_aggregates):
+    return AggregatesService(dynamodb_resource=mocked_aggregates)
+
+
+def test_aggregates_service_init_no_table_name():
+    if "AGGREGATES_TABLE_NAME" in os.environ:
+        del os.environ["AGGREGATES_TABLE_NAME"]
+    with pytest.raises(ValueError, match="AGGREGATES_TABLE_NAME environment variable not set."):
+        AggregatesService(dynamodb_resource=MagicMock())
+
+
+def test_add_tag_counts_adds_and_removes(aggregates_service_instance):
+    aggregates_service_instance.add_tag_counts({"sky": 1, "sun": 1})
+    aggregates_service_instance.add_tag_counts({"sky": 1})
+    assert sorted(aggregates_service_instance.query_tags("s")) == [("sky", 2), ("sun", 1)]
+
+    aggregates_service_instance.add_tag_counts({"sun": -1, "sky": -1})
+    assert aggregates_service_instance.query_tags("s") == [("sky", 1)]
+    item = aggregates_service_instance.table.get_item(Key={"pk": "TAG#s", "sk": "sky"})["Item"]
+    assert item["count"] == 1
+
+
+def test_query_tags_by_prefix(aggregates_service_instance):
+    aggregates_service_instance.add_tag_counts({"nature": 1, "night": 1, "sunset": 1})
+    assert aggregates_service_instance.query_tags("na") == [("nature", 1)]
+    assert aggregates_service_instance.query_tags("n") == [("nature", 1), ("night", 1)]
+    assert sorted(aggregates_service_instance.all_tags()) == [("nature", 1), ("night", 1), ("sunset", 1)]
+
+
+def test_all_tags_reads_tag_shards_only(aggregates_service_instance):
+    aggregates_service_instance.add_tag_counts({"old": 2})
+    aggregates_service_instance.table.delete_item(Key={"pk": "TAG_SHARDS", "sk": "o"})  # Counted before the directory.
+    aggregates_service_instance.add_image_counts(1, {"image/png": 1})
+    aggregates_service_instance.put_cached_page("image/png", None, [{"imageId": "a"}], None, 1)
+    assert aggregates_service_instance.all_tags() == [("old", 2)]
+
+    aggregates_service_instance.add_tag_counts({"new": 1, "nest": 1})
+    scan = MagicMock(wraps=aggregates_service_instance.table.scan)
+    aggregates_service_instance.table.scan = scan
+    assert sorted(aggregates_service_instance.all_tags()) == [("nest", 1), ("new", 1), ("old", 2)]
+    scan.assert_not_called()
+
+    aggregates_service_instance.add_tag_counts({"new": -1, "nest": -1})
+    assert aggregates_service_instance.all_tags() == [("old", 2)]
+
+
+def test_add_tag_counts_dynamodb_error(aggregates_service_instance):
+    aggregates_service_instance.table.update_item = MagicMock(
+        side_effect=ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "UpdateItem")
+    )
+    with pytest.raises(DatabaseError, match="Failed to update count for tag 'x'"):
+        aggregates_service_instance.add_tag_counts({"x": 1})
+
+
+def test_query_tags_dynamodb_error(aggregates_service_instance):
+    aggregates_service_instance.table.query = MagicMock(
+        side_effect=ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "Query")
+    )
+    with pytest.raises(DatabaseError, match="Failed to query tags with prefix 'a'"):
+        aggregates_service_instance.query_tags("a")
+
+
+def test_record_images_updates_all_aggregates(aggregates_service_instance):
+    rows = [
+        {"imageId": "1", "contentType": "image/jpeg", "tags": ["sky", "sky", ""]},
+        {"imageId": "2", "contentType": "image/jpeg", "tags": ["sky", "sea"]},
+        {"imageId": "3", "contentType": "image/png"},
+    ]
+    aggregates_service_instance.record_images(rows, 1)
+    assert aggregates_service_instance.get_image_counts() == {
+        "total": 3, "contentTypes": {"image/jpeg": 2, "image/png": 1}
+    }
+    assert aggregates_service_instance.get_tag_count("sky") == 2
+
+    aggregates_service_instance.record_images(rows[2:], -1)
+    assert aggregates_service_instance.get_image_counts() == {"total": 2, "contentTypes": {"image/jpeg": 2}}
+    assert aggregates_service_instance.get_tag_count("missing") == 0
+
+
+def test_get_image_counts_empty_table(aggregates_service_instance):
+    assert aggregates_service_instance.get_image_counts() == {"total": 0, "contentTypes": {}}
+
+
+def test_add_image_counts_dynamodb_error(aggregates_service_instance):
+    aggregates_service_instance.table.update_item = MagicMock(
+        side_effect=ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "UpdateItem")
+    )
+    with pytest.raises(DatabaseError, match="Failed to update image counts"):
+        aggregates_service_instance.add_image_counts(1, {"image/png": 1})
+
+
+def test_shared_page_round_trip(aggregates_service_instance):
+    from decimal import Decimal
+    items = [{"imageId": "a", "uploadTimestamp": Decimal("1700000000"), "score": Decimal("0.5")}]
+    lek = {"imageId": "a", "contentType": "image/png"}
+    assert aggregates_service_instance.put_cached_page("image/png", None, items, lek, 1000)
+    assert aggregates_service_instance.get_cached_page("image/png", None, 60, 1060) == (
+        [{"imageId": "a", "uploadTimestamp": 1700000000, "score": 0.5}], lek
+    )
+    assert aggregates_service_instance.get_cached_page("image/png", None, 60, 1061) is None
+    assert aggregates_service_instance.get_cached_page("image/png", lek, 60, 1000) is None
+
+
+def test_shared_page_too_large_is_not_stored(aggregates_service_instance, monkeypatch):
+    monkeypatch.setattr("src.services.aggregates_service.MAX_SHARED_PAGE_BYTES", 10)
+    assert not aggregates_service_instance.put_cached_page("image/png", None, [{"imageId": "a" * 100}], None, 1)
+    assert aggregates_service_instance.get_cached_page("image/png", None, 60, 1) is None
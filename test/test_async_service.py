@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import MagicMock
+from src.services.async_service import AsyncService
+from src.exceptions import S3Error
+
+
+def test_methods_run_off_the_event_loop_thread():
+    service = MagicMock()
+    service.get_item.side_effect = lambda image_id: (image_id, threading.get_ident())
+
+    async def main():
+        return await AsyncService(service).get_item("a"), threading.get_ident()
+
+    (image_id, worker_thread), loop_thread = asyncio.run(main())
+    assert image_id == "a"
+    assert worker_thread != loop_thread
+
+
+def test_independent_calls_overlap():
+    barrier = threading.Barrier(3, timeout=5)
+    service = MagicMock()
+    service.delete_item.side_effect = lambda image_id: barrier.wait() and image_id
+
+    async def main():
+        async_service = AsyncService(service)
+        return await asyncio.gather(*(async_service.delete_item(str(i)) for i in range(3)))
+
+    assert len(asyncio.run(main())) == 3
+
+
+def test_errors_and_attributes_pass_through():
+    service = MagicMock()
+    service.bucket_name = "images"
+    service.delete_file.side_effect = S3Error("nope")
+    async_service = AsyncService(service)
+    assert async_service.bucket_name == "images"
+    with pytest.raises(S3Error, match="nope"):
+        asyncio.run(async_service.delete_file("k"))
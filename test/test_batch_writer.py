@@ -0,0 +1,102 @@
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from botocore.exceptions import ClientError
+from src.services.batch_writer import BatchWriter
+from src.services.dynamodb_service import DynamoDBService
+from src.exceptions import BatchWriteError, DatabaseError
+
+
+@pytest.fixture
+def dynamodb_service_instance(mocked_dynamodb):
+    return DynamoDBService(dynamodb_resource=mocked_dynamodb)
+
+
+def _requests(call):
+    (requests,) = call.kwargs["RequestItems"].values()
+    return requests
+
+
+def test_flushes_every_25_items_and_on_exit(dynamodb_service_instance):
+    client = dynamodb_service_instance.table.meta.client
+    with patch.object(client, "batch_write_item", wraps=client.batch_write_item) as batch_write_item:
+        with dynamodb_service_instance.batch_writer(max_latency=None) as writer:
+            for i in range(60):
+                writer.put_item({"imageId": f"i{i}", "n": i})
+            assert [len(_requests(c)) for c in batch_write_item.call_args_list] == [25, 25]
+        assert [len(_requests(c)) for c in batch_write_item.call_args_list] == [25, 25, 10]
+    items, _ = dynamodb_service_instance.scan_items()
+    assert len(items) == 60
+
+
+def test_flushes_after_max_latency(dynamodb_service_instance):
+    writer = dynamodb_service_instance.batch_writer(max_latency=0.01)
+    writer.put_item({"imageId": "late"})
+    deadline = time.monotonic() + 5
+    while "Item" not in dynamodb_service_instance.table.get_item(Key={"imageId": "late"}):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    writer.close()
+
+
+def test_dedupes_queued_keys_last_write_wins(dynamodb_service_instance):
+    dynamodb_service_instance.table.put_item(Item={"imageId": "gone"})
+    with dynamodb_service_instance.batch_writer(max_latency=None) as writer:
+        writer.put_item({"imageId": "a", "v": 1})
+        writer.put_item({"imageId": "a", "v": 2})
+        writer.put_item({"imageId": "gone"})
+        writer.delete_item({"imageId": "gone"})
+        assert len(writer._buffer) == 2
+    assert dynamodb_service_instance.table.get_item(Key={"imageId": "a"})["Item"]["v"] == 2
+    assert "Item" not in dynamodb_service_instance.table.get_item(Key={"imageId": "gone"})
+
+
+def test_retries_unprocessed_items_with_backoff():
+    client = MagicMock()
+    leftover = {"t": [{"PutRequest": {"Item": {"imageId": "b"}}}]}
+    client.batch_write_item.side_effect = [{"UnprocessedItems": leftover}, {"UnprocessedItems": {}}]
+    with patch("src.services.batch_writer.time.sleep") as sleep:
+        with BatchWriter(client, "t", max_latency=None) as writer:
+            writer.put_item({"imageId": "a"})
+            writer.put_item({"imageId": "b"})
+    assert client.batch_write_item.call_args_list[1].kwargs["RequestItems"] == leftover
+    sleep.assert_called_once()
+    assert 0 <= sleep.call_args.args[0] <= 0.05
+
+
+def test_gives_up_after_max_attempts():
+    client = MagicMock()
+    client.batch_write_item.side_effect = lambda RequestItems: {"UnprocessedItems": RequestItems}
+    with patch("src.services.batch_writer.time.sleep"):
+        writer = BatchWriter(client, "t", max_latency=None, max_attempts=3)
+        writer.put_item({"imageId": "a"})
+        with pytest.raises(DatabaseError, match="1 items still unprocessed after 3 attempts"):
+            writer.flush()
+    assert client.batch_write_item.call_count == 3
+
+
+def test_timed_flush_error_surfaces_on_next_call():
+    client = MagicMock()
+    client.batch_write_item.side_effect = ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "BatchWriteItem")
+    writer = BatchWriter(client, "t", max_latency=0.01)
+    writer.put_item({"imageId": "a"})
+    deadline = time.monotonic() + 5
+    while writer._error is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    with pytest.raises(DatabaseError, match="Failed to batch write 1 items"):
+        writer.put_item({"imageId": "b"})
+
+
+def test_failure_reports_keys_already_written():
+    client = MagicMock()
+    client.batch_write_item.side_effect = [
+        {"UnprocessedItems": {"t": [{"PutRequest": {"Item": {"imageId": "i1"}}}]}},
+        ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "BatchWriteItem"),
+    ]
+    with patch("src.services.batch_writer.time.sleep"):
+        writer = BatchWriter(client, "t", max_latency=None)
+        with pytest.raises(BatchWriteError) as raised:
+            for i in range(25):
+                writer.put_item({"imageId": f"i{i}"})
+    assert sorted(raised.value.written) == sorted((f"i{i}",) for i in range(25) if i != 1)
@@ -0,0 +1,55 @@
+import pytest
+import base64
+from decimal import Decimal
+from unittest.mock import patch
+from src.utils.cursor import encode_cursor, decode_cursor
+from src.exceptions import InvalidCursorError
+
+
+def test_round_trip_and_compact():
+    key = {"imageId": "0b5ec5e4-8a3b-4bb4-9b23-4b8f0c3d8e11", "contentType": "image/jpeg"}
+    token = encode_cursor("contentType", key, "image/jpeg")
+    assert decode_cursor(token, "contentType", "image/jpeg") == key
+    assert "=" not in token
+    assert len(token) < len(base64.b64encode(b'{"imageId": "0b5ec5e4-8a3b-4bb4-9b23-4b8f0c3d8e11", "contentType": "image/jpeg"}'))
+
+
+def test_numeric_values_round_trip():
+    with patch.dict("src.utils.cursor.ACCESS_PATHS", {"test": (9, ("imageId", "ts", "score"))}):
+        key = {"imageId": "a", "ts": Decimal("1700000000"), "score": Decimal("1.5")}
+        assert decode_cursor(encode_cursor("test", key), "test") == {"imageId": "a", "ts": 1700000000, "score": Decimal("1.5")}
+
+
+def test_key_must_match_access_path():
+    with pytest.raises(ValueError):
+        encode_cursor("scan", {"imageId": "a", "contentType": "image/png"})
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda t: t[:-2] + ("A" if t[-2] != "A" else "B") + t[-1],
+    lambda t: t[:10],
+    lambda t: "!!!" + t,
+    lambda t: "",
+])
+def test_tampered_tokens_rejected(mutate):
+    token = encode_cursor("scan", {"imageId": "abc"})
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(mutate(token), "scan")
+
+
+def test_bound_to_access_path_and_filter():
+    token = encode_cursor("tags", {"imageId": "abc"}, "sky")
+    assert decode_cursor(token, "tags", "sky") == {"imageId": "abc"}
+    with pytest.raises(InvalidCursorError, match="signature"):
+        decode_cursor(token, "tags", "sea")
+    with pytest.raises(InvalidCursorError, match="not issued for 'scan'"):
+        decode_cursor(encode_cursor("tags", {"imageId": "abc"}), "scan")
+
+
+def test_expired_cursor_rejected():
+    with patch("src.utils.cursor.time.time", return_value=1000):
+        token = encode_cursor("scan", {"imageId": "abc"}, ttl_seconds=60)
+        assert decode_cursor(token, "scan") == {"imageId": "abc"}
+    with patch("src.utils.cursor.time.time", return_value=1061):
+        with pytest.raises(InvalidCursorError, match="expired"):
+            decode_cursor(token, "scan")
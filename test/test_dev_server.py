@@ -0,0 +1,105 @@
+import pytest
+import json
+import base64
+from werkzeug.test import Client, EnvironBuilder
+from werkzeug.wrappers import Request
+from src.local import dev_server
+
+
+@pytest.fixture
+def client(aws_credentials, set_env_vars, monkeypatch):
+    monkeypatch.setattr('src.handlers.decorators._s3_service', None)
+    monkeypatch.setattr('src.handlers.decorators._dynamodb_service', None)
+    monkeypatch.setattr('src.handlers.decorators._aggregates_service', None)
+    monkeypatch.setattr('src.handlers.list_tags._tries', {})
+    with dev_server.local_backend():
+        processing_queue = dev_server.LocalProcessingQueue()
+        client = Client(dev_server.create_app(processing_queue=processing_queue))
+        client.processing_queue = processing_queue
+        yield client
+
+
+def test_build_event_encodes_multipart_body():
+    builder = EnvironBuilder(
+        method="POST", path="/images", query_string="a=1",
+        data={"file": (open("imageFiles/image3.png", "rb"), "image3.png"), "tags": "x"},
+    )
+    event = dev_server.build_event(Request(builder.get_environ()))
+    assert event["resource"] == "/images"
+    assert event["httpMethod"] == "POST"
+    assert event["isBase64Encoded"] is True
+    assert event["queryStringParameters"] == {"a": "1"}
+    assert b"image3.png" in base64.b64decode(event["body"])
+
+
+def test_build_event_path_parameters():
+    event = dev_server.build_event(Request(EnvironBuilder(method="GET", path="/images/abc").get_environ()))
+    assert event["resource"] == "/images/{imageId}"
+    assert event["pathParameters"] == {"imageId": "abc"}
+    assert event["queryStringParameters"] is None
+    assert event["isBase64Encoded"] is False
+
+
+def test_build_response_decodes_base64_body():
+    response = dev_server.build_response(
+        {"statusCode": 200, "headers": {"Content-Type": "image/png"}, "body": base64.b64encode(b"png").decode(), "isBase64Encoded": True}
+    )
+    assert response.status_code == 200
+    assert response.get_data() == b"png"
+
+
+def test_round_trip_upload_list_get_delete(client):
+    with open("imageFiles/image3.png", "rb") as f:
+        response = client.post("/images", data={"file": (f, "image3.png", "image/png"), "tags": "a,b"})
+    assert response.status_code == 201
+    image_id = json.loads(response.get_data())["imageId"]
+
+    client.processing_queue.drain()
+    items = json.loads(client.get("/images").get_data())["items"]
+    assert [i["imageId"] for i in items] == [image_id]
+    assert items[0]["tags"] == ["a", "b"]
+    assert items[0]["status"] == "ready"
+    assert len(items[0]["phash"]) == 16
+
+    tags = json.loads(client.get("/tags?prefix=a").get_data())["items"]
+    assert tags == [{"tag": "a", "count": 1}]
+
+    response = client.get(f"/images/{image_id}")
+    assert response.status_code == 302
+    assert image_id in response.headers["Location"]
+
+    response = client.get(f"/images/{image_id}?mode=proxy", headers={"Range": "bytes=1-3"})
+    assert response.status_code == 206
+    assert response.get_data() == b"PNG"
+
+    assert client.delete(f"/images/{image_id}").status_code == 200
+    assert client.get(f"/images/{image_id}").status_code == 404
+
+
+def test_bulk_upload_round_trip(client):
+    with open("imageFiles/image1.jpg", "rb") as f1, open("imageFiles/image3.png", "rb") as f3:
+        response = client.post("/images/batch", data={
+            "a": (f1, "image1.jpg", "image/jpeg"),
+            "b": (f3, "image3.png", "image/png"),
+            "b.description": "png",
+        })
+    assert response.status_code == 201
+    results = json.loads(response.get_data())["results"]
+    assert [r["filename"] for r in results] == ["image1.jpg", "image3.png"]
+
+    client.processing_queue.drain()
+    items = {i["filename"]: i for i in json.loads(client.get("/images").get_data())["items"]}
+    assert items["image3.png"]["description"] == "png"
+    assert "description" not in items["image1.jpg"]
+    assert {i["status"] for i in items.values()} == {"ready"}
+
+
+def test_owner_gallery(client):
+    for user in ("alice", "alice", "bob"):
+        with open("imageFiles/image3.png", "rb") as f:
+            response = client.post("/images", data={"file": (f, "image3.png", "image/png")}, headers={"X-Local-User": user})
+        assert response.status_code == 201
+
+    items = json.loads(client.get("/images?owner=me", headers={"X-Local-User": "alice"}).get_data())["items"]
+    assert len(items) == 2 and {i["owner"] for i in items} == {"alice"}
+    assert client.get("/images?owner=me").status_code == 401
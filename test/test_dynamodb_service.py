@@ -62,6 +62,13 @@ def test_delete_item_success(dynamodb_service_instance):
     assert "Item" not in response
 
 
+def test_delete_item_missing_row(dynamodb_service_instance):
+    dynamodb_service_instance.table.put_item(Item={"imageId": "once"})
+    dynamodb_service_instance.delete_item("once")
+    with pytest.raises(ImageNotFoundError, match="'once' not found"):
+        dynamodb_service_instance.delete_item("once")
+
+
 def test_delete_item_dynamodb_error(dynamodb_service_instance):
     dynamodb_service_instance.table.delete_item = MagicMock(
         side_effect=ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "DeleteItem")
@@ -137,4 +144,209 @@ def test_query_by_tag_dynamodb_error(dynamodb_service_instance):
         side_effect=ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "Scan")
     )
     with pytest.raises(DatabaseError, match="Failed to query by tag"):
-        dynamodb_service_instance.query_by_tag("test-tag")
\ No newline at end of file
+        dynamodb_service_instance.query_by_tag("test-tag")
+
+def test_scan_hashes_pages_and_filters(dynamodb_service_instance):
+    dynamodb_service_instance.table.put_item(Item={"imageId": "h1", "phash": "01", "processedTimestamp": 10, "filename": "a"})
+    dynamodb_service_instance.table.put_item(Item={"imageId": "h2", "phash": "02", "processedTimestamp": 20})
+    dynamodb_service_instance.table.put_item(Item={"imageId": "nohash", "processedTimestamp": 30})
+
+    items = sorted(dynamodb_service_instance.scan_hashes(), key=lambda i: i["imageId"])
+    assert items == [
+        {"imageId": "h1", "phash": "01", "processedTimestamp": 10},
+        {"imageId": "h2", "phash": "02", "processedTimestamp": 20},
+    ]
+
+
+def test_query_hashes_since_reads_only_recent_buckets(dynamodb_service_instance):
+    for image_id, processed in [("old", 3599), ("edge", 7200), ("new", 7300), ("later", 11000)]:
+        dynamodb_service_instance.table.put_item(Item={
+            "imageId": image_id, "phash": "01", "processedTimestamp": processed, "hashBucket": processed // 3600,
+        })
+    dynamodb_service_instance.table.put_item(Item={"imageId": "unhashed", "processedTimestamp": 7250})
+    query = MagicMock(wraps=dynamodb_service_instance.table.query)
+    dynamodb_service_instance.table.query = query
+
+    items = dynamodb_service_instance.query_hashes_since(7200, 7400)
+    assert sorted(i["imageId"] for i in items) == ["edge", "new"]
+    assert [c.kwargs["IndexName"] for c in query.call_args_list] == ["HashIndex"]
+
+    items = dynamodb_service_instance.query_hashes_since(7250, 11000)
+    assert sorted(i["imageId"] for i in items) == ["later", "new"]
+    assert query.call_count == 1 + 2
+
+
+def test_query_hashes_since_dynamodb_error(dynamodb_service_instance):
+    dynamodb_service_instance.table.query = MagicMock(
+        side_effect=ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "Query")
+    )
+    with pytest.raises(DatabaseError, match="Failed to query perceptual hashes"):
+        list(dynamodb_service_instance.query_hashes_since(0, 10))
+
+
+def test_scan_hashes_dynamodb_error(dynamodb_service_instance):
+    dynamodb_service_instance.table.scan = MagicMock(
+        side_effect=ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "Scan")
+    )
+    with pytest.raises(DatabaseError, match="Failed to scan perceptual hashes"):
+        list(dynamodb_service_instance.scan_hashes())
+
+
+def test_update_item_success(dynamodb_service_instance):
+    dynamodb_service_instance.table.put_item(Item={"imageId": "u1", "status": "processing"})
+    dynamodb_service_instance.update_item("u1", {"status": "ready", "phash": "ff"})
+    item = dynamodb_service_instance.table.get_item(Key={"imageId": "u1"})["Item"]
+    assert item == {"imageId": "u1", "status": "ready", "phash": "ff"}
+
+
+def test_update_item_missing_row(dynamodb_service_instance):
+    with pytest.raises(ImageNotFoundError, match="Image with ID 'missing' not found."):
+        dynamodb_service_instance.update_item("missing", {"status": "ready"})
+
+
+def test_batch_put_items_success(dynamodb_service_instance):
+    items = [{"imageId": f"b{i}", "filename": f"{i}.jpg"} for i in range(30)]
+    dynamodb_service_instance.batch_put_items(items)
+    items_found, _ = dynamodb_service_instance.scan_items()
+    assert len(items_found) == 30
+
+
+def test_batch_put_items_dynamodb_error(dynamodb_service_instance, monkeypatch):
+    monkeypatch.setattr(dynamodb_service_instance.table.meta.client, "batch_write_item", MagicMock(
+        side_effect=ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "BatchWriteItem")
+    ))
+    with pytest.raises(DatabaseError, match="Failed to batch write 1 items"):
+        dynamodb_service_instance.batch_put_items([{"imageId": "x"}])
+
+
+def test_count_items_parallel_scan(dynamodb_service_instance):
+    for i in range(7):
+        dynamodb_service_instance.table.put_item(Item={
+            "imageId": f"c{i}", "contentType": "image/png" if i % 2 else "image/jpeg", "tags": ["odd"] if i % 2 else ["even"]
+        })
+    assert dynamodb_service_instance.count_items() == 7
+    assert dynamodb_service_instance.count_items(content_type="image/png") == 3
+    assert dynamodb_service_instance.count_items(tag="even", total_segments=2) == 4
+
+
+def test_count_items_dynamodb_error(dynamodb_service_instance):
+    dynamodb_service_instance.table.meta.client.scan = MagicMock(
+        side_effect=ClientError({"Error": {"Code": "500", "Message": "DB error"}}, "Scan")
+    )
+    with pytest.raises(DatabaseError, match="Failed to count items"):
+        dynamodb_service_instance.count_items()
+
+
+def test_get_item_coalesces_concurrent_reads(dynamodb_service_instance):
+    import threading
+    dynamodb_service_instance.table.put_item(Item={"imageId": "hot", "filename": "viral.jpg"})
+    original_get_item = dynamodb_service_instance.table.get_item
+    release, calls = threading.Event(), []
+
+    def slow_get_item(**kwargs):
+        calls.append(kwargs)
+        release.wait(5)
+        return original_get_item(**kwargs)
+
+    dynamodb_service_instance.table.get_item = slow_get_item
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(dynamodb_service_instance.get_item("hot"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while not calls or dynamodb_service_instance._flight._calls[('get_item', 'hot')].waiters < 4:
+        threading.Event().wait(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"imageId": "hot", "filename": "viral.jpg"}] * 5
+
+
+def test_coalesced_wait_timeout_raises_database_error(dynamodb_service_instance, monkeypatch):
+    monkeypatch.setattr(dynamodb_service_instance._flight, "do", MagicMock(side_effect=TimeoutError("slow")))
+    with pytest.raises(DatabaseError, match="slow"):
+        dynamodb_service_instance.scan_items()
+
+
+def test_record_access_accumulates_reads(dynamodb_service_instance):
+    dynamodb_service_instance.table.put_item(Item={"imageId": "r"})
+    dynamodb_service_instance.record_access("r", 20, 100)
+    dynamodb_service_instance.record_access("r", 20, 200)
+    item = dynamodb_service_instance.table.get_item(Key={"imageId": "r"})["Item"]
+    assert item["readCount"] == 40
+    assert item["lastAccessed"] == 200
+
+
+def test_record_access_missing_row(dynamodb_service_instance):
+    with pytest.raises(ImageNotFoundError):
+        dynamodb_service_instance.record_access("missing", 1, 100)
+
+
+def test_scan_tiering_candidates(dynamodb_service_instance):
+    for item in [
+        {"imageId": "old-unread", "s3_key": "a", "uploadTimestamp": 10},
+        {"imageId": "old-read-recently", "s3_key": "b", "uploadTimestamp": 10, "lastAccessed": 500},
+        {"imageId": "old-read-long-ago", "s3_key": "c", "uploadTimestamp": 10, "lastAccessed": 50},
+        {"imageId": "new", "s3_key": "d", "uploadTimestamp": 500},
+        {"imageId": "already-tiered", "s3_key": "e", "uploadTimestamp": 10, "storageClass": "STANDARD_IA"},
+    ]:
+        dynamodb_service_instance.table.put_item(Item=item)
+    candidates = dynamodb_service_instance.scan_tiering_candidates(100)
+    assert sorted(row["imageId"] for row in candidates) == ["old-read-long-ago", "old-unread"]
+
+
+def _owned_rows(owner, count, start=1000):
+    from src.models.image_metadata import ImageMetadata
+    return [
+        ImageMetadata(imageId=f"{owner}-{i:03d}", filename="a.png", s3_key="k", uploadTimestamp=start + i // 2,
+                      contentType="image/png" if i % 3 else "image/gif", tags=["odd"] if i % 2 else [],
+                      owner=owner).to_item()
+        for i in range(count)
+    ]
+
+
+def test_query_by_owner_merges_shards_newest_first(dynamodb_service_instance):
+    rows = _owned_rows("alice", 23) + _owned_rows("bob", 5)
+    dynamodb_service_instance.batch_put_items(rows)
+    assert len({row["ownerShard"] for row in rows if row["owner"] == "alice"}) > 1
+
+    seen, key = [], None
+    while True:
+        items, key = dynamodb_service_instance.query_by_owner("alice", key, page_size=5)
+        assert len(items) <= 5
+        seen += items
+        if not key:
+            break
+    expected = sorted((r for r in rows if r["owner"] == "alice"), key=lambda r: r["ownerSortKey"], reverse=True)
+    assert [item["imageId"] for item in seen] == [r["imageId"] for r in expected]
+
+
+def test_query_by_owner_filters(dynamodb_service_instance):
+    rows = _owned_rows("alice", 12)
+    dynamodb_service_instance.batch_put_items(rows)
+
+    def all_pages(**filters):
+        seen, key = [], None
+        while True:
+            items, key = dynamodb_service_instance.query_by_owner("alice", key, page_size=2, **filters)
+            seen += [item["imageId"] for item in items]
+            if not key:
+                return sorted(seen)
+
+    assert all_pages(content_type="image/gif") == sorted(r["imageId"] for r in rows if r["contentType"] == "image/gif")
+    assert all_pages(tag="odd") == sorted(r["imageId"] for r in rows if "tags" in r)
+    assert all_pages(content_type="image/png", tag="odd") == sorted(
+        r["imageId"] for r in rows if "tags" in r and r["contentType"] == "image/png"
+    )
+    assert dynamodb_service_instance.query_by_owner("carol") == ([], None)
+
+
+def test_writes_invalidate_cached_content_type_pages(dynamodb_service_instance):
+    from src.utils.page_cache import content_type_pages
+    generation = content_type_pages.generation
+    dynamodb_service_instance.put_item({"imageId": "w", "contentType": "image/png"})
+    dynamodb_service_instance.update_item("w", {"status": "ready"})
+    dynamodb_service_instance.batch_put_items([{"imageId": "w2"}])
+    dynamodb_service_instance.delete_item("w")
+    assert content_type_pages.generation == generation + 4
@@ -2,12 +2,17 @@ import pytest
 import json
 import base64
 from unittest.mock import MagicMock, patch
-from src.handlers import upload_image, list_images, get_image, delete_image
+from botocore.exceptions import ClientError
+from src.utils.cursor import decode_cursor, encode_cursor
+from src.utils.page_cache import PageCache
+from src.handlers import upload_image, list_images, get_image, delete_image, router, search_similar, process_image, list_tags, bulk_upload_images, image_stats, refresh_page_cache, build_similarity_snapshot
 from src.exceptions import (
     InvalidRequestError,
     S3Error,
     DatabaseError,
     ImageNotFoundError,
+    RangeNotSatisfiableError,
+    BatchWriteError,
 )
 
 @pytest.fixture(autouse=True)
@@ -19,6 +24,15 @@ def mock_services(monkeypatch, set_env_vars):
     monkeypatch.setattr('src.handlers.decorators._dynamodb_service', mock_dynamodb)
     return mock_s3, mock_dynamodb
 
+
+@pytest.fixture(autouse=True)
+def mock_aggregates(monkeypatch):
+    mock_aggregates_service = MagicMock()
+    monkeypatch.setattr('src.handlers.decorators._aggregates_service', mock_aggregates_service)
+    monkeypatch.setattr('src.handlers.list_tags._tries', {})
+    monkeypatch.setattr('src.handlers.list_images.content_type_pages', PageCache(60, 2))
+    return mock_aggregates_service
+
 @pytest.fixture
 def mock_context():
     """Mock Lambda context object."""
@@ -58,6 +72,57 @@ def test_upload_image_success(mock_time, mock_services, mock_context):
         assert metadata["description"] == "A test image"
         assert metadata["tags"] == ["test", "mock"]
         assert metadata["uploadTimestamp"] == 1678886400
+        assert metadata["status"] == "processing"
+
+
+@patch('time.time', return_value=1678886400)
+def test_upload_image_moves_undeclared_fields_to_side_object(mock_time, mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    image_file = MagicMock(filename="a.jpg", content_type="image/jpeg", read=MagicMock(return_value=b"data"))
+    form = {"description": "d", "camera": "X100", "location": "Lisbon"}
+    with patch('src.handlers.upload_image.parse_multipart', return_value=(form, {"file": image_file})):
+        response = upload_image.handler({"headers": {}, "body": ""}, mock_context)
+
+    assert response["statusCode"] == 201
+    image_id = json.loads(response["body"])["imageId"]
+    item = mock_dynamodb_service.put_item.call_args[0][0]
+    assert item["hasExtra"] is True
+    assert "camera" not in item and item["description"] == "d"
+    side_object = mock_s3_service.upload_file.call_args_list[0][0]
+    assert side_object[1:] == (f"metadata/{image_id}.json", "application/json")
+    assert json.loads(side_object[0]) == {"camera": "X100", "location": "Lisbon"}
+
+
+@pytest.mark.parametrize("form, message", [
+    ({"description": "x" * 2001}, "description must be at most 2000 characters."),
+    ({"tags": ",".join(f"t{i}" for i in range(21))}, "At most 20 tags are allowed."),
+    ({"tags": "a," + "b" * 65}, "Each tag must be at most 64 characters."),
+    ({"bad name": "v"}, "Invalid field name 'bad name'."),
+    ({"notes": "x" * 17000}, "Additional fields must total at most 16384 bytes."),
+])
+def test_upload_image_rejects_invalid_metadata(mock_services, mock_context, form, message):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    image_file = MagicMock(filename="a.jpg", content_type="image/jpeg")
+    with patch('src.handlers.upload_image.parse_multipart', return_value=(form, {"file": image_file})):
+        response = upload_image.handler({"headers": {}, "body": ""}, mock_context)
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"])["message"] == message
+    mock_s3_service.upload_file.assert_not_called()
+    mock_dynamodb_service.put_item.assert_not_called()
+
+
+@patch('time.time', return_value=1678886400)
+def test_upload_image_records_owner(mock_time, mock_services, mock_context):
+    _, mock_dynamodb_service = mock_services
+    image_file = MagicMock(filename="a.jpg", content_type="image/jpeg", read=MagicMock(return_value=b"data"))
+    event = {"headers": {}, "body": "", "requestContext": {"authorizer": {"principalId": "user-1"}}}
+    with patch('src.handlers.upload_image.parse_multipart', return_value=({}, {"file": image_file})):
+        response = upload_image.handler(event, mock_context)
+    image_id = json.loads(response["body"])["imageId"]
+    item = mock_dynamodb_service.put_item.call_args[0][0]
+    assert item["owner"] == "user-1"
+    assert item["ownerShard"] in {f"user-1#{i}" for i in range(4)}
+    assert item["ownerSortKey"] == f"1678886400#{image_id}"
 
 
 def test_upload_image_missing_file_part(mock_context):
@@ -130,6 +195,104 @@ def test_list_images_success_get_item(mock_services, mock_context):
     mock_dynamodb_service.get_item.assert_called_once_with("2")
 
 
+def test_list_images_get_item_merges_extra_fields(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "2", "filename": "b.png", "hasExtra": True}
+    mock_s3_service.get_file.return_value = b'{"camera":"X100"}'
+    response = list_images.handler({"queryStringParameters": {"imageId": "2"}}, mock_context)
+    assert json.loads(response["body"])["items"] == [{"camera": "X100", "imageId": "2", "filename": "b.png", "hasExtra": True}]
+    mock_s3_service.get_file.assert_called_once_with("metadata/2.json")
+
+
+def test_list_images_content_type_first_pages_cached(mock_services, mock_aggregates, mock_context):
+    _, mock_dynamodb_service = mock_services
+    lek = {"imageId": "a", "contentType": "image/png"}
+    mock_dynamodb_service.query_by_content_type.return_value = ([{"imageId": "a"}], lek)
+    event = {"queryStringParameters": {"contentType": "image/png"}}
+
+    first = list_images.handler(event, mock_context)
+    assert list_images.handler(event, mock_context)["body"] == first["body"]
+    mock_dynamodb_service.query_by_content_type.assert_called_once_with("image/png", None)
+    mock_aggregates.get_cached_page.assert_not_called()
+
+    event["queryStringParameters"]["nextToken"] = json.loads(first["body"])["nextToken"]
+    list_images.handler(event, mock_context)
+    list_images.handler(event, mock_context)
+    assert mock_dynamodb_service.query_by_content_type.call_count == 2
+
+
+def test_list_images_shared_page_cache(mock_services, mock_aggregates, mock_context, monkeypatch):
+    _, mock_dynamodb_service = mock_services
+    monkeypatch.setattr('src.handlers.list_images.CONTENT_TYPE_PAGE_CACHE', 'shared')
+    mock_aggregates.get_cached_page.return_value = ([{"imageId": "shared"}], None)
+    event = {"queryStringParameters": {"contentType": "image/png"}}
+    assert json.loads(list_images.handler(event, mock_context)["body"])["items"] == [{"imageId": "shared"}]
+    mock_dynamodb_service.query_by_content_type.assert_not_called()
+
+    mock_aggregates.get_cached_page.return_value = None
+    mock_dynamodb_service.query_by_content_type.return_value = ([{"imageId": "gsi"}], None)
+    event = {"queryStringParameters": {"contentType": "image/gif"}}
+    assert json.loads(list_images.handler(event, mock_context)["body"])["items"] == [{"imageId": "gsi"}]
+
+    mock_aggregates.get_cached_page.side_effect = DatabaseError("throttled")
+    event = {"queryStringParameters": {"contentType": "image/jpeg"}}
+    assert list_images.handler(event, mock_context)["statusCode"] == 200
+    assert mock_dynamodb_service.query_by_content_type.call_count == 2
+
+
+def test_refresh_page_cache_stores_first_pages_of_popular_types(mock_services, mock_aggregates, mock_context, monkeypatch):
+    _, mock_dynamodb_service = mock_services
+    monkeypatch.setattr('src.handlers.refresh_page_cache.SHARED_CACHE_CONTENT_TYPES', 2)
+    monkeypatch.setattr('src.handlers.refresh_page_cache.CONTENT_TYPE_CACHE_PAGES', 2)
+    mock_aggregates.get_image_counts.return_value = {"total": 9, "contentTypes": {"image/png": 5, "image/gif": 1, "image/jpeg": 3}}
+    pages = {
+        ("image/png", None): ([{"imageId": "p1"}], {"imageId": "p1", "contentType": "image/png"}),
+        ("image/png", "p1"): ([{"imageId": "p2"}], {"imageId": "p2", "contentType": "image/png"}),
+        ("image/jpeg", None): ([{"imageId": "j1"}], None),
+    }
+    mock_dynamodb_service.query_by_content_type.side_effect = \
+        lambda content_type, start: pages[(content_type, start and start["imageId"])]
+    mock_aggregates.put_cached_page.return_value = True
+
+    result = refresh_page_cache.handler({}, mock_context)
+
+    assert result == {"refreshed": {"image/png": 2, "image/jpeg": 1}}
+    stored = [(c.args[0], c.args[1]) for c in mock_aggregates.put_cached_page.call_args_list]
+    assert stored == [("image/png", None), ("image/png", {"imageId": "p1", "contentType": "image/png"}), ("image/jpeg", None)]
+
+
+def test_list_images_owner_me(mock_services, mock_context):
+    _, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.query_by_owner.return_value = ([{"imageId": "mine"}], {"ownerSortKey": "0000001000#mine"})
+    event = {
+        "queryStringParameters": {"owner": "me", "contentType": "image/png"},
+        "requestContext": {"authorizer": {"claims": {"sub": "user-1"}}},
+    }
+    body = json.loads(list_images.handler(event, mock_context)["body"])
+    assert body["items"] == [{"imageId": "mine"}]
+    mock_dynamodb_service.query_by_owner.assert_called_once_with("user-1", None, content_type="image/png", tag=None)
+
+    event["queryStringParameters"]["nextToken"] = body["nextToken"]
+    list_images.handler(event, mock_context)
+    mock_dynamodb_service.query_by_owner.assert_called_with(
+        "user-1", {"ownerSortKey": "0000001000#mine"}, content_type="image/png", tag=None
+    )
+
+    event["requestContext"]["authorizer"] = {"principalId": "user-2"}
+    assert list_images.handler(event, mock_context)["statusCode"] == 400
+
+
+@pytest.mark.parametrize("owner, authorizer, status", [
+    ("me", None, 401),
+    ("user-1", {"principalId": "user-2"}, 400),
+])
+def test_list_images_owner_rejected(mock_services, mock_context, owner, authorizer, status):
+    _, mock_dynamodb_service = mock_services
+    event = {"queryStringParameters": {"owner": owner}, "requestContext": {"authorizer": authorizer}}
+    assert list_images.handler(event, mock_context)["statusCode"] == status
+    mock_dynamodb_service.query_by_owner.assert_not_called()
+
+
 def test_list_images_success_query_content_type(mock_services, mock_context):
     _, mock_dynamodb_service = mock_services
     mock_dynamodb_service.query_by_content_type.return_value = ([{"imageId": "3", "contentType": "image/gif"}], None)
@@ -153,8 +316,32 @@ def test_list_images_pagination(mock_services, mock_context):
     assert response["statusCode"] == 200
     body = json.loads(response["body"])
     assert "nextToken" in body
-    decoded_token = json.loads(base64.b64decode(body["nextToken"]))
-    assert decoded_token == {"imageId": "4_last"}
+    assert decode_cursor(body["nextToken"], "scan") == {"imageId": "4_last"}
+
+    event = {"queryStringParameters": {"nextToken": body["nextToken"]}}
+    assert list_images.handler(event, mock_context)["statusCode"] == 200
+    mock_dynamodb_service.scan_items.assert_called_with({"imageId": "4_last"})
+
+
+def test_list_images_cursor_bound_to_filter(mock_services, mock_context):
+    _, mock_dynamodb_service = mock_services
+    token = encode_cursor("contentType", {"imageId": "1", "contentType": "image/png"}, "image/png")
+    event = {"queryStringParameters": {"contentType": "image/jpeg", "nextToken": token}}
+    response = list_images.handler(event, mock_context)
+    assert response["statusCode"] == 400
+    mock_dynamodb_service.query_by_content_type.assert_not_called()
+
+    event = {"queryStringParameters": {"nextToken": token}}
+    assert list_images.handler(event, mock_context)["statusCode"] == 400
+    mock_dynamodb_service.scan_items.assert_not_called()
+
+
+def test_list_images_legacy_json_token_rejected(mock_services, mock_context):
+    _, mock_dynamodb_service = mock_services
+    token = base64.b64encode(json.dumps({"imageId": "x"}).encode()).decode()
+    response = list_images.handler({"queryStringParameters": {"nextToken": token}}, mock_context)
+    assert response["statusCode"] == 400
+    mock_dynamodb_service.scan_items.assert_not_called()
 
 
 def test_list_images_invalid_next_token(mock_context):
@@ -253,4 +440,606 @@ def test_delete_image_database_error(mock_services, mock_context):
     event = {"pathParameters": {"imageId": "delid"}}
     response = delete_image.handler(event, mock_context)
     assert response["statusCode"] == 500
-    assert json.loads(response["body"])["message"] == "A service error occurred."
\ No newline at end of file
+    assert json.loads(response["body"])["message"] == "A service error occurred."
+
+
+def test_delete_image_deletes_object_and_row_concurrently(mock_services, mock_aggregates, mock_context):
+    import threading
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "delid", "s3_key": "dels3key"}
+    both_started = threading.Barrier(2, timeout=5)
+    mock_s3_service.delete_file.side_effect = lambda key: both_started.wait()
+    mock_dynamodb_service.delete_item.side_effect = lambda image_id: both_started.wait()
+
+    response = delete_image.handler({"pathParameters": {"imageId": "delid"}}, mock_context)
+    assert response["statusCode"] == 200
+
+
+def test_delete_image_s3_error_restores_row_so_retry_works(mock_services, mock_aggregates, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    metadata = {"imageId": "delid", "s3_key": "dels3key", "contentType": "image/png"}
+    mock_dynamodb_service.get_item.return_value = metadata
+    mock_s3_service.delete_file.side_effect = S3Error("S3 delete failed")
+    response = delete_image.handler({"pathParameters": {"imageId": "delid"}}, mock_context)
+    assert response["statusCode"] == 500
+    mock_dynamodb_service.delete_item.assert_called_once_with("delid")
+    mock_dynamodb_service.put_item.assert_called_once_with(metadata)
+    mock_aggregates.record_images.assert_not_called()
+
+    mock_s3_service.delete_file.side_effect = None
+    response = delete_image.handler({"pathParameters": {"imageId": "delid"}}, mock_context)
+    assert response["statusCode"] == 200
+    assert mock_dynamodb_service.delete_item.call_count == 2
+    mock_aggregates.record_images.assert_called_once_with([metadata], -1)
+
+
+def test_delete_image_extra_object_error_restores_row(mock_services, mock_aggregates, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    metadata = {"imageId": "delid", "s3_key": "dels3key", "hasExtra": True}
+    mock_dynamodb_service.get_item.return_value = metadata
+
+    def delete_file(key):
+        if key.startswith("metadata/"):
+            raise S3Error("boom")
+    mock_s3_service.delete_file.side_effect = delete_file
+    response = delete_image.handler({"pathParameters": {"imageId": "delid"}}, mock_context)
+    assert response["statusCode"] == 500
+    mock_dynamodb_service.put_item.assert_called_once_with(metadata)
+
+
+def test_delete_image_restore_failure_still_counts_deleted_row(mock_services, mock_aggregates, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "delid", "s3_key": "dels3key"}
+    mock_s3_service.delete_file.side_effect = S3Error("S3 delete failed")
+    mock_dynamodb_service.put_item.side_effect = DatabaseError("throttled")
+    response = delete_image.handler({"pathParameters": {"imageId": "delid"}}, mock_context)
+    assert response["statusCode"] == 500
+    mock_aggregates.record_images.assert_called_once()
+
+
+@pytest.fixture
+def real_services(mocked_s3, mocked_dynamodb, mocked_aggregates, monkeypatch):
+    from src.services.s3_service import S3Service
+    from src.services.dynamodb_service import DynamoDBService
+    from src.services.aggregates_service import AggregatesService
+    services = (S3Service(s3_client=mocked_s3), DynamoDBService(dynamodb_resource=mocked_dynamodb),
+                AggregatesService(dynamodb_resource=mocked_aggregates))
+    monkeypatch.setattr('src.handlers.decorators._s3_service', services[0])
+    monkeypatch.setattr('src.handlers.decorators._dynamodb_service', services[1])
+    monkeypatch.setattr('src.handlers.decorators._aggregates_service', services[2])
+    return services
+
+
+def test_delete_image_counts_a_raced_delete_once(real_services, mock_context, monkeypatch):
+    s3_service, dynamodb_service, aggregates_service = real_services
+    row = {"imageId": "raced", "s3_key": "raced-a.png", "contentType": "image/png", "tags": ["cat", "dog"]}
+    other = {"imageId": "other", "s3_key": "other-b.png", "contentType": "image/png", "tags": ["cat"]}
+    for item in (row, other):
+        s3_service.upload_file(b"x", item["s3_key"], "image/png")
+        dynamodb_service.put_item(item)
+    aggregates_service.record_images([row, other], 1)
+
+    event = {"pathParameters": {"imageId": "raced"}}
+    assert delete_image.handler(event, mock_context)["statusCode"] == 200
+    # A second request that read the row before the first one deleted it.
+    monkeypatch.setattr(dynamodb_service, "get_item", lambda image_id: dict(row))
+    assert delete_image.handler(event, mock_context)["statusCode"] == 404
+
+    counts = aggregates_service.get_image_counts()
+    assert counts["total"] == 1 and counts["contentTypes"] == {"image/png": 1}
+    assert aggregates_service.get_tag_count("cat") == 1
+    assert aggregates_service.get_tag_count("dog") == 0
+    assert aggregates_service.query_tags("c") == [("cat", 1)]
+
+
+def test_delete_image_removes_extra_fields_object(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "delid", "s3_key": "dels3key", "hasExtra": True}
+    response = delete_image.handler({"pathParameters": {"imageId": "delid"}}, mock_context)
+    assert response["statusCode"] == 200
+    assert sorted(c[0][0] for c in mock_s3_service.delete_file.call_args_list) == ["dels3key", "metadata/delid.json"]
+
+
+def test_router_dispatches_by_resource(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "imgid", "s3_key": "s3key"}
+    mock_s3_service.get_file_url.return_value = "http://mock-s3-url.com/s3key"
+    event = {"httpMethod": "GET", "resource": "/images/{imageId}", "pathParameters": {"imageId": "imgid"}}
+    response = router.handler(event, mock_context)
+    assert response["statusCode"] == 302
+    mock_dynamodb_service.get_item.assert_called_once_with("imgid")
+
+
+def test_router_resolves_raw_path(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "delid", "s3_key": "dels3key"}
+    event = {"httpMethod": "DELETE", "path": "/images/delid"}
+    response = router.handler(event, mock_context)
+    assert response["statusCode"] == 200
+    mock_s3_service.delete_file.assert_called_once_with("dels3key")
+
+
+def test_router_unknown_path(mock_context):
+    response = router.handler({"httpMethod": "GET", "path": "/unknown"}, mock_context)
+    assert response["statusCode"] == 404
+
+
+def test_router_method_not_allowed(mock_context):
+    response = router.handler({"httpMethod": "PUT", "resource": "/images"}, mock_context)
+    assert response["statusCode"] == 405
+
+
+@pytest.fixture
+def fresh_similarity_index(monkeypatch):
+    monkeypatch.setattr('src.handlers.search_similar._index', None)
+
+
+def _snapshot(hashes, watermark):
+    from src.utils.hash_snapshot import pack_snapshot
+    return pack_snapshot(list(hashes), [int(h, 16) for h in hashes.values()], watermark)
+
+
+def test_search_similar_by_image_id(mock_services, mock_context, fresh_similarity_index):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "q", "phash": "00000000000000ff"}
+    mock_s3_service.get_file.return_value = _snapshot(
+        {"q": "00000000000000ff", "near": "00000000000000fe", "far": "ffffffffffffff00"}, 3
+    )
+    mock_dynamodb_service.query_hashes_since.return_value = []
+    event = {"queryStringParameters": {"imageId": "q", "distance": "4"}}
+    response = search_similar.handler(event, mock_context)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["items"] == [{"imageId": "near", "distance": 1}]
+    mock_s3_service.get_file.assert_called_once_with("index/phash-snapshot.bin")
+    mock_dynamodb_service.scan_hashes.assert_not_called()
+
+
+@patch('time.time', return_value=1000)
+def test_search_similar_by_hash_refreshes_incrementally(mock_time, mock_services, mock_context, fresh_similarity_index, monkeypatch):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_s3_service.get_file.return_value = _snapshot({"a": "0000000000000000"}, 3)
+    mock_dynamodb_service.query_hashes_since.return_value = [{"imageId": "c", "phash": "ffffffffffffffff", "processedTimestamp": 5}]
+    event = {"queryStringParameters": {"hash": "0000000000000001"}}
+    assert json.loads(search_similar.handler(event, mock_context)["body"])["items"] == [{"imageId": "a", "distance": 1}]
+    mock_dynamodb_service.query_hashes_since.assert_called_once_with(3, 1000)
+
+    monkeypatch.setattr('src.handlers.search_similar.INDEX_REFRESH_SECONDS', -1)
+    mock_dynamodb_service.query_hashes_since.return_value = [{"imageId": "b", "phash": "0000000000000001", "processedTimestamp": 6}]
+    body = json.loads(search_similar.handler(event, mock_context)["body"])
+    assert body["items"] == [{"imageId": "b", "distance": 0}, {"imageId": "a", "distance": 1}]
+    mock_dynamodb_service.query_hashes_since.assert_called_with(5, 1000)
+    mock_s3_service.get_file.assert_called_once()
+    mock_dynamodb_service.scan_hashes.assert_not_called()
+
+
+@patch('time.time', return_value=10000)
+def test_search_similar_without_snapshot_uses_recent_hashes(mock_time, mock_services, mock_context, fresh_similarity_index, monkeypatch):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    monkeypatch.setattr('src.handlers.search_similar.INDEX_REBUILD_SECONDS', 3600)
+    missing = ClientError({"Error": {"Code": "NoSuchKey", "Message": "missing"}}, "GetObject")
+    mock_s3_service.get_file.side_effect = S3Error("missing")
+    mock_s3_service.get_file.side_effect.__cause__ = missing
+    mock_dynamodb_service.query_hashes_since.return_value = [{"imageId": "new", "phash": "0000000000000000", "processedTimestamp": 9000}]
+    body = json.loads(search_similar.handler({"queryStringParameters": {"hash": "0"}}, mock_context)["body"])
+    assert body["items"] == [{"imageId": "new", "distance": 0}]
+    mock_dynamodb_service.query_hashes_since.assert_called_once_with(6400, 10000)
+
+
+def test_search_similar_snapshot_read_error_is_not_cached(mock_services, mock_context, fresh_similarity_index):
+    mock_s3_service, _ = mock_services
+    mock_s3_service.get_file.side_effect = S3Error("throttled")
+    response = search_similar.handler({"queryStringParameters": {"hash": "0"}}, mock_context)
+    assert response["statusCode"] == 500
+    assert search_similar._index is None
+
+
+@patch('time.time', return_value=5000)
+def test_build_similarity_snapshot(mock_time, mock_services, mock_context):
+    from src.utils.hash_snapshot import unpack_snapshot
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.scan_hashes.return_value = [
+        {"imageId": "a", "phash": "00000000000000ff", "processedTimestamp": 1},
+        {"imageId": "b", "phash": "ffffffffffffffff", "processedTimestamp": 2},
+    ]
+    assert build_similarity_snapshot.handler({}, mock_context) == {"hashes": 2, "watermark": 4940}
+    data, key, content_type = mock_s3_service.upload_file.call_args[0]
+    assert key == "index/phash-snapshot.bin"
+    ids, hashes, watermark = unpack_snapshot(data)
+    assert (ids, hashes.tolist(), watermark) == (["a", "b"], [0xFF, 2**64 - 1], 4940)
+
+
+def test_search_similar_image_without_hash(mock_services, mock_context):
+    _, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "q"}
+    response = search_similar.handler({"queryStringParameters": {"imageId": "q"}}, mock_context)
+    assert response["statusCode"] == 409
+
+
+@pytest.mark.parametrize("params", [None, {"hash": "zz"}, {"hash": "0", "distance": "65"}, {"hash": "0", "limit": "x"}])
+def test_search_similar_bad_request(mock_context, params):
+    response = search_similar.handler({"queryStringParameters": params}, mock_context)
+    assert response["statusCode"] == 400
+
+
+def _sqs_s3_event(*keys, message_id="msg-1"):
+    return {"Records": [{
+        "messageId": message_id,
+        "eventSource": "aws:sqs",
+        "body": json.dumps({"Records": [
+            {"eventSource": "aws:s3", "eventName": "ObjectCreated:Put", "s3": {"object": {"key": key}}} for key in keys
+        ]}),
+    }]}
+
+
+def test_process_image_marks_ready_with_hash(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    with open("imageFiles/image3.png", "rb") as f:
+        mock_s3_service.get_file.return_value = f.read()
+    image_id = "0b5ec5e4-8a3b-4bb4-9b23-4b8f0c3d8e11"
+    result = process_image.handler(_sqs_s3_event(f"{image_id}-my+photo.png"), mock_context)
+    assert result == {"batchItemFailures": []}
+    mock_s3_service.get_file.assert_called_once_with(f"{image_id}-my photo.png")
+    updated_id, attributes = mock_dynamodb_service.update_item.call_args[0]
+    assert updated_id == image_id
+    assert attributes["status"] == "ready"
+    assert len(attributes["phash"]) == 16
+    assert attributes["hashBucket"] == attributes["processedTimestamp"] // 3600
+
+
+def test_process_image_non_image_still_ready(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_s3_service.get_file.return_value = b"not an image"
+    process_image.handler(_sqs_s3_event("0b5ec5e4-8a3b-4bb4-9b23-4b8f0c3d8e11-a.txt"), mock_context)
+    attributes = mock_dynamodb_service.update_item.call_args[0][1]
+    assert attributes["status"] == "ready"
+    assert "phash" not in attributes and "hashBucket" not in attributes
+
+
+def test_process_image_reports_partial_batch_failures(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_s3_service.get_file.return_value = b"data"
+    mock_dynamodb_service.update_item.side_effect = [None, ImageNotFoundError("missing"), S3Error("boom")]
+    event = {"Records": [
+        _sqs_s3_event(f"0b5ec5e4-8a3b-4bb4-9b23-4b8f0c3d8e1{i}-a.jpg", message_id=f"m{i}")["Records"][0] for i in range(3)
+    ]}
+    event["Records"].append(_sqs_s3_event("not-an-upload.jpg", message_id="m3")["Records"][0])
+    result = process_image.handler(event, mock_context)
+    assert result == {"batchItemFailures": [{"itemIdentifier": "m1"}, {"itemIdentifier": "m2"}]}
+
+
+def test_process_image_skips_storage_class_copies(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    event = _sqs_s3_event("0b5ec5e4-8a3b-4bb4-9b23-4b8f0c3d8e11-a.png")
+    message = json.loads(event["Records"][0]["body"])
+    message["Records"][0]["eventName"] = "ObjectCreated:Copy"
+    event["Records"][0]["body"] = json.dumps(message)
+    assert process_image.handler(event, mock_context) == {"batchItemFailures": []}
+    mock_s3_service.get_file.assert_not_called()
+    mock_dynamodb_service.update_item.assert_not_called()
+
+
+def test_process_image_skips_non_image_objects(mock_services, mock_context):
+    mock_s3_service, _ = mock_services
+    event = _sqs_s3_event("metadata/0b5ec5e4-8a3b-4bb4-9b23-4b8f0c3d8e11.json", "debug/profiles/upload_image-1.prof")
+    assert process_image.handler(event, mock_context) == {"batchItemFailures": []}
+    mock_s3_service.get_file.assert_not_called()
+
+
+def test_process_image_ignores_test_events(mock_services, mock_context):
+    mock_s3_service, _ = mock_services
+    event = {"Records": [{"messageId": "t", "eventSource": "aws:sqs", "body": json.dumps({"Event": "s3:TestEvent"})}]}
+    assert process_image.handler(event, mock_context) == {"batchItemFailures": []}
+    mock_s3_service.get_file.assert_not_called()
+
+
+def test_upload_image_updates_aggregates(mock_aggregates, mock_context):
+    mock_file = MagicMock(filename="test.jpg", content_type="image/jpeg", read=lambda: b"data")
+    with patch('src.handlers.upload_image.parse_multipart', return_value=({"tags": "a, b"}, {"file": mock_file})):
+        event = {"headers": {"Content-Type": "multipart/form-data; boundary=mock"}, "body": "mock_body"}
+        assert upload_image.handler(event, mock_context)["statusCode"] == 201
+    rows, delta = mock_aggregates.record_images.call_args[0]
+    assert delta == 1
+    assert rows[0]["tags"] == ["a", "b"] and rows[0]["contentType"] == "image/jpeg"
+
+
+def test_upload_image_aggregates_failure_is_not_fatal(mock_aggregates, mock_context):
+    mock_aggregates.record_images.side_effect = DatabaseError("throttled")
+    mock_file = MagicMock(filename="test.jpg", content_type="image/jpeg", read=lambda: b"data")
+    with patch('src.handlers.upload_image.parse_multipart', return_value=({"tags": "a"}, {"file": mock_file})):
+        event = {"headers": {"Content-Type": "multipart/form-data; boundary=mock"}, "body": "mock_body"}
+        assert upload_image.handler(event, mock_context)["statusCode"] == 201
+
+
+def test_delete_image_updates_aggregates(mock_services, mock_aggregates, mock_context):
+    _, mock_dynamodb_service = mock_services
+    metadata = {"imageId": "delid", "s3_key": "k", "tags": ["a"], "contentType": "image/png"}
+    mock_dynamodb_service.get_item.return_value = metadata
+    assert delete_image.handler({"pathParameters": {"imageId": "delid"}}, mock_context)["statusCode"] == 200
+    mock_aggregates.record_images.assert_called_once_with([metadata], -1)
+
+
+def test_list_tags_prefix_uses_cached_shard(mock_aggregates, mock_context):
+    mock_aggregates.query_tags.return_value = [("nature", 5), ("nap", 1), ("night", 9), ("natural", 5)]
+    response = list_tags.handler({"queryStringParameters": {"prefix": "na", "limit": "2"}}, mock_context)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["items"] == [{"tag": "natural", "count": 5}, {"tag": "nature", "count": 5}]
+
+    response = list_tags.handler({"queryStringParameters": {"prefix": "ni"}}, mock_context)
+    assert json.loads(response["body"])["items"] == [{"tag": "night", "count": 9}]
+    mock_aggregates.query_tags.assert_called_once_with("n")
+
+
+def test_list_tags_without_prefix_returns_most_popular(mock_aggregates, mock_context):
+    mock_aggregates.all_tags.return_value = [("sky", 3), ("art", 7)]
+    response = list_tags.handler({"queryStringParameters": None}, mock_context)
+    assert json.loads(response["body"])["items"] == [{"tag": "art", "count": 7}, {"tag": "sky", "count": 3}]
+
+
+def test_list_tags_invalid_limit(mock_context):
+    response = list_tags.handler({"queryStringParameters": {"limit": "0"}}, mock_context)
+    assert response["statusCode"] == 400
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=0-1,5-6", None),
+    ("bytes=9-3", None),
+    ("items=0-1", None),
+])
+def test_parse_range(header, expected):
+    assert get_image.parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiableError):
+        get_image.parse_range(header, 1000)
+
+
+def test_get_image_proxy_range(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "imgid", "s3_key": "s3key"}
+    mock_s3_service.head_file.return_value = (1000, "image/jpeg")
+    mock_s3_service.iter_file_range.return_value = iter([b"ab", b"cdef", b"g"])
+    event = {
+        "pathParameters": {"imageId": "imgid"},
+        "queryStringParameters": {"mode": "proxy"},
+        "headers": {"Range": "bytes=10-16"},
+    }
+    response = get_image.handler(event, mock_context)
+    assert response["statusCode"] == 206
+    assert response["isBase64Encoded"] is True
+    assert base64.b64decode(response["body"]) == b"abcdefg"
+    assert response["headers"]["Content-Range"] == "bytes 10-16/1000"
+    assert response["headers"]["Accept-Ranges"] == "bytes"
+    mock_s3_service.iter_file_range.assert_called_once_with("s3key", 10, 16)
+
+
+def test_get_image_proxy_full_object(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "imgid", "s3_key": "s3key"}
+    mock_s3_service.head_file.return_value = (3, "image/png")
+    mock_s3_service.iter_file_range.return_value = iter([b"png"])
+    event = {"pathParameters": {"imageId": "imgid"}, "queryStringParameters": {"mode": "proxy"}}
+    response = get_image.handler(event, mock_context)
+    assert response["statusCode"] == 200
+    assert "Content-Range" not in response["headers"]
+    assert response["headers"]["Content-Type"] == "image/png"
+    mock_s3_service.iter_file_range.assert_called_once_with("s3key", 0, 2)
+
+
+def test_get_image_proxy_unsatisfiable_range(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "imgid", "s3_key": "s3key"}
+    mock_s3_service.head_file.return_value = (10, "image/png")
+    event = {
+        "pathParameters": {"imageId": "imgid"},
+        "queryStringParameters": {"mode": "proxy"},
+        "headers": {"range": "bytes=20-"},
+    }
+    response = get_image.handler(event, mock_context)
+    assert response["statusCode"] == 416
+    assert response["headers"]["Content-Range"] == "bytes */10"
+
+
+def test_get_image_proxy_falls_back_to_redirect(mock_services, mock_context, monkeypatch):
+    monkeypatch.setattr('src.handlers.get_image.PROXY_MAX_BYTES', 100)
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "imgid", "s3_key": "s3key"}
+    mock_s3_service.head_file.return_value = (1000, "image/jpeg")
+    mock_s3_service.get_file_url.return_value = "http://mock-s3-url.com/s3key"
+    event = {"pathParameters": {"imageId": "imgid"}, "queryStringParameters": {"mode": "proxy"}}
+    response = get_image.handler(event, mock_context)
+    assert response["statusCode"] == 302
+    assert response["headers"]["Location"] == "http://mock-s3-url.com/s3key"
+    mock_s3_service.iter_file_range.assert_not_called()
+
+
+@patch('time.time', return_value=1700000000)
+def test_get_image_records_sampled_access(mock_time, mock_services, mock_context, monkeypatch):
+    _, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "imgid", "s3_key": "s3key"}
+    monkeypatch.setattr('src.handlers.get_image.ACCESS_SAMPLE_RATE', 0.25)
+    event = {"pathParameters": {"imageId": "imgid"}}
+
+    with patch('src.handlers.get_image.random.random', return_value=0.5):
+        get_image.handler(event, mock_context)
+    mock_dynamodb_service.record_access.assert_not_called()
+
+    with patch('src.handlers.get_image.random.random', return_value=0.1):
+        mock_dynamodb_service.record_access.side_effect = DatabaseError("throttled")
+        assert get_image.handler(event, mock_context)["statusCode"] == 302
+    mock_dynamodb_service.record_access.assert_called_once_with("imgid", 4, 1700000000)
+
+
+def test_get_image_access_sampling_disabled(mock_services, mock_context, monkeypatch):
+    _, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.get_item.return_value = {"imageId": "imgid", "s3_key": "s3key"}
+    monkeypatch.setattr('src.handlers.get_image.ACCESS_SAMPLE_RATE', 0)
+    get_image.handler({"pathParameters": {"imageId": "imgid"}}, mock_context)
+    mock_dynamodb_service.record_access.assert_not_called()
+
+
+def test_create_binary_response_encodes_across_chunk_boundaries():
+    from src.handlers.common import create_binary_response
+    data = bytes(range(256)) * 3
+    chunks = [data[:1], data[1:5], data[5:400], data[400:]]
+    response = create_binary_response(200, chunks, {})
+    assert response["body"] == base64.b64encode(data).decode()
+
+
+def _file_parts(*names):
+    from werkzeug.datastructures import MultiDict
+    return MultiDict([
+        (part, MagicMock(filename=f"{i}.jpg", content_type="image/jpeg", read=MagicMock(return_value=b"data")))
+        for i, part in enumerate(names)
+    ])
+
+
+def test_bulk_upload_success(mock_services, mock_aggregates, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    form = {"tags": "trip", "file1.description": "first", "file2.tags": "trip,beach"}
+    with patch('src.handlers.bulk_upload_images.parse_multipart', return_value=(form, _file_parts("file1", "file2"))):
+        response = bulk_upload_images.handler({"headers": {}, "body": ""}, mock_context)
+
+    assert response["statusCode"] == 201
+    results = json.loads(response["body"])["results"]
+    assert [r["status"] for r in results] == ["uploaded", "uploaded"]
+    assert mock_s3_service.upload_file.call_count == 2
+
+    rows = mock_dynamodb_service.batch_put_items.call_args[0][0]
+    assert [r["imageId"] for r in rows] == [r["imageId"] for r in results]
+    assert rows[0]["description"] == "first" and rows[0]["tags"] == ["trip"]
+    assert "description" not in rows[1] and rows[1]["tags"] == ["trip", "beach"]
+    assert all(r["status"] == "processing" for r in rows)
+    mock_aggregates.record_images.assert_called_once_with(rows, 1)
+
+
+def test_bulk_upload_partial_failure(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_s3_service.upload_file.side_effect = [None, S3Error("boom")]
+    with patch('src.handlers.bulk_upload_images.BULK_UPLOAD_WORKERS', 1), \
+         patch('src.handlers.bulk_upload_images.parse_multipart', return_value=({}, _file_parts("file", "file"))):
+        response = bulk_upload_images.handler({"headers": {}, "body": ""}, mock_context)
+
+    assert response["statusCode"] == 207
+    results = json.loads(response["body"])["results"]
+    assert [r["status"] for r in results] == ["uploaded", "failed"]
+    assert len(mock_dynamodb_service.batch_put_items.call_args[0][0]) == 1
+
+
+def test_bulk_upload_file_failure_removes_extra_fields_object(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+
+    def upload_file(body, key, content_type):
+        if not key.startswith("metadata/"):
+            raise S3Error("boom")
+    mock_s3_service.upload_file.side_effect = upload_file
+    form = {"file.camera": "X100"}
+    with patch('src.handlers.bulk_upload_images.parse_multipart', return_value=(form, _file_parts("file"))):
+        response = bulk_upload_images.handler({"headers": {}, "body": ""}, mock_context)
+
+    assert response["statusCode"] == 500
+    assert [r["status"] for r in json.loads(response["body"])["results"]] == ["failed"]
+    uploaded = [c.args[1] for c in mock_s3_service.upload_file.call_args_list]
+    extra = next(key for key in uploaded if key.startswith("metadata/"))
+    assert extra in [c.args[0] for c in mock_s3_service.delete_file.call_args_list]
+    mock_dynamodb_service.batch_put_items.assert_not_called()
+
+
+def test_bulk_upload_metadata_failure_removes_objects(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.batch_put_items.side_effect = DatabaseError("throttled")
+    with patch('src.handlers.bulk_upload_images.parse_multipart', return_value=({}, _file_parts("file", "file"))):
+        response = bulk_upload_images.handler({"headers": {}, "body": ""}, mock_context)
+    assert response["statusCode"] == 500
+    assert mock_s3_service.delete_file.call_count == 2
+    assert [r["status"] for r in json.loads(response["body"])["results"]] == ["failed", "failed"]
+
+
+def test_bulk_upload_metadata_failure_keeps_committed_batches(mock_services, mock_aggregates, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+
+    def fail_after_first(rows):
+        raise BatchWriteError("throttled", [(rows[0]["imageId"],)])
+    mock_dynamodb_service.batch_put_items.side_effect = fail_after_first
+    with patch('src.handlers.bulk_upload_images.parse_multipart', return_value=({}, _file_parts("file", "file"))):
+        response = bulk_upload_images.handler({"headers": {}, "body": ""}, mock_context)
+
+    assert response["statusCode"] == 207
+    results = json.loads(response["body"])["results"]
+    assert [r["status"] for r in results] == ["uploaded", "failed"]
+    assert "imageId" not in results[1]
+    rows = mock_dynamodb_service.batch_put_items.call_args[0][0]
+    mock_aggregates.record_images.assert_called_once_with([rows[0]], 1)
+    mock_s3_service.delete_file.assert_called_once_with(rows[1]["s3_key"])
+
+
+def test_bulk_upload_reports_invalid_metadata_per_file(mock_services, mock_context):
+    mock_s3_service, mock_dynamodb_service = mock_services
+    form = {"file1.description": "x" * 2001}
+    with patch('src.handlers.bulk_upload_images.parse_multipart', return_value=(form, _file_parts("file1", "file2"))):
+        response = bulk_upload_images.handler({"headers": {}, "body": ""}, mock_context)
+    assert response["statusCode"] == 207
+    results = json.loads(response["body"])["results"]
+    assert results[0] == {"filename": "0.jpg", "status": "failed", "message": "description must be at most 2000 characters."}
+    assert results[1]["status"] == "uploaded"
+    assert mock_s3_service.upload_file.call_count == 1
+
+    with patch('src.handlers.bulk_upload_images.parse_multipart', return_value=(form, _file_parts("file1"))):
+        assert bulk_upload_images.handler({"headers": {}, "body": ""}, mock_context)["statusCode"] == 400
+
+
+@pytest.mark.parametrize("parts, message", [
+    ((), "At least one file part is required."),
+    (("file",) * 51, "At most 50 files can be uploaded per request."),
+])
+def test_bulk_upload_rejects_file_count(mock_context, parts, message):
+    with patch('src.handlers.bulk_upload_images.parse_multipart', return_value=({}, _file_parts(*parts))):
+        response = bulk_upload_images.handler({"headers": {}, "body": ""}, mock_context)
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"])["message"] == message
+
+
+def test_image_stats_from_counters(mock_aggregates, mock_context):
+    mock_aggregates.get_image_counts.return_value = {"total": 3, "contentTypes": {"image/png": 3}}
+    response = image_stats.handler({"queryStringParameters": None}, mock_context)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"mode": "counters", "count": 3, "contentTypes": {"image/png": 3}}
+
+    response = image_stats.handler({"queryStringParameters": {"contentType": "image/gif"}}, mock_context)
+    assert json.loads(response["body"]) == {"mode": "counters", "count": 0, "contentType": "image/gif"}
+
+
+def test_image_stats_tag_count(mock_aggregates, mock_context):
+    mock_aggregates.get_tag_count.return_value = 4
+    response = image_stats.handler({"queryStringParameters": {"tags": "sky"}}, mock_context)
+    assert json.loads(response["body"]) == {"mode": "counters", "count": 4, "tags": "sky"}
+    mock_aggregates.get_tag_count.assert_called_once_with("sky")
+
+
+def test_image_stats_scan_mode(mock_services, mock_aggregates, mock_context):
+    _, mock_dynamodb_service = mock_services
+    mock_dynamodb_service.count_items.return_value = 9
+    event = {"queryStringParameters": {"mode": "scan", "contentType": "image/png"}}
+    response = image_stats.handler(event, mock_context)
+    assert json.loads(response["body"]) == {"mode": "scan", "count": 9, "contentType": "image/png"}
+    mock_dynamodb_service.count_items.assert_called_once_with(content_type="image/png", tag=None)
+    mock_aggregates.get_image_counts.assert_not_called()
+
+
+def test_image_stats_invalid_mode(mock_context):
+    response = image_stats.handler({"queryStringParameters": {"mode": "guess"}}, mock_context)
+    assert response["statusCode"] == 400
+
+
+def test_router_prefers_literal_stats_route(mock_aggregates, mock_context):
+    mock_aggregates.get_image_counts.return_value = {"total": 0, "contentTypes": {}}
+    response = router.handler({"httpMethod": "GET", "path": "/images/stats"}, mock_context)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["count"] == 0
@@ -0,0 +1,52 @@
+import json
+import pytest
+from src.models.image_metadata import ImageMetadata, extra_key
+from src.exceptions import InvalidRequestError
+
+
+def _from_form(form, content_type="image/png"):
+    return ImageMetadata.from_form("id-1", "id-1-a.png", "a.png", content_type, form, 1700000000)
+
+
+def test_declared_fields_only_on_item():
+    metadata = _from_form({"description": "sunset", "tags": " sky, sea ,,sky", "camera": "X100"})
+    assert metadata.to_item() == {
+        "imageId": "id-1",
+        "filename": "a.png",
+        "s3_key": "id-1-a.png",
+        "contentType": "image/png",
+        "uploadTimestamp": 1700000000,
+        "status": "processing",
+        "description": "sunset",
+        "tags": ["sky", "sea"],
+        "hasExtra": True,
+    }
+    assert json.loads(metadata.extra_document()) == {"camera": "X100"}
+    assert extra_key(metadata.imageId) == "metadata/id-1.json"
+
+
+def test_minimal_item_omits_empty_fields():
+    item = _from_form({"description": "", "tags": ""}, content_type=None).to_item()
+    assert set(item) == {"imageId", "filename", "s3_key", "uploadTimestamp", "status"}
+
+
+def test_uses_slots():
+    metadata = _from_form({})
+    assert not hasattr(metadata, "__dict__")
+    with pytest.raises(AttributeError):
+        metadata.unknown = 1
+
+
+@pytest.mark.parametrize("form", [
+    {"extra": "a"} | {f"f{i}": "v" for i in range(50)},
+    {"1starts-with-digit": "v"},
+    {"tags": ["a", 1]},
+])
+def test_rejects_invalid_forms(form):
+    with pytest.raises(InvalidRequestError):
+        _from_form(form)
+
+
+def test_rejects_long_filename():
+    with pytest.raises(InvalidRequestError, match="filename must be at most 255 characters."):
+        ImageMetadata.from_form("id", "key", "a" * 256, "image/png", {}, 0)
@@ -0,0 +1,46 @@
+from unittest.mock import patch
+from src.utils.page_cache import PageCache
+
+
+def _chain(cache, value, pages):
+    start = None
+    for n in range(pages):
+        lek = {"imageId": f"{value}-{n}"}
+        cache.put(value, start, [n], lek)
+        start = lek
+
+
+def test_only_first_pages_are_cached():
+    cache = PageCache(ttl=60, max_pages=2)
+    _chain(cache, "image/png", 3)
+    assert cache.get("image/png", None) == ([0], {"imageId": "image/png-0"})
+    assert cache.get("image/png", {"imageId": "image/png-0"}) == ([1], {"imageId": "image/png-1"})
+    assert cache.get("image/png", {"imageId": "image/png-1"}) is None
+
+
+def test_pages_without_a_cached_predecessor_are_not_cached():
+    cache = PageCache(ttl=60, max_pages=3)
+    cache.put("image/png", {"imageId": "somewhere"}, [5], None)
+    assert cache.get("image/png", {"imageId": "somewhere"}) is None
+
+
+def test_entries_expire():
+    cache = PageCache(ttl=10, max_pages=1)
+    with patch("src.utils.page_cache.time.monotonic", return_value=100):
+        cache.put("image/png", None, [], None)
+    with patch("src.utils.page_cache.time.monotonic", return_value=109):
+        assert cache.get("image/png", None) == ([], None)
+    with patch("src.utils.page_cache.time.monotonic", return_value=110):
+        assert cache.get("image/png", None) is None
+
+
+def test_invalidate_drops_pages_and_rejects_older_reads():
+    cache = PageCache(ttl=60, max_pages=1)
+    generation = cache.generation
+    cache.put("image/png", None, [1], None, generation=generation)
+    cache.invalidate()
+    assert cache.get("image/png", None) is None
+    cache.put("image/png", None, [1], None, generation=generation)
+    assert cache.get("image/png", None) is None
+    cache.put("image/png", None, [2], None, generation=cache.generation)
+    assert cache.get("image/png", None) == ([2], None)
@@ -0,0 +1,74 @@
+import pstats
+import pytest
+from unittest.mock import MagicMock
+from src.utils import profiling
+from src.utils.profiling import profiled
+
+
+def _allocating_handler(event, context):
+    return {"statusCode": 200, "body": len([bytearray(1024) for _ in range(100)])}
+
+
+@pytest.fixture
+def output(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_OUTPUT", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_ENABLED", True)
+    return tmp_path
+
+
+def test_writes_pstats_and_allocations(output):
+    context = MagicMock(aws_request_id="req-1")
+    assert profiled(_allocating_handler)({}, context) == {"statusCode": 200, "body": 100}
+
+    (prof,) = output.glob("*-req-1.prof")
+    assert prof.name.startswith("test_profiling-")
+    stats = pstats.Stats(str(prof))
+    assert any(name == "_allocating_handler" for _, _, name in stats.stats)
+
+    (mem,) = output.glob("*-req-1.mem.txt")
+    report = mem.read_text()
+    assert report.startswith("Top ")
+    assert "bytearray(1024)" in report
+
+
+def test_not_profiled_unless_enabled_or_sampled(output, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ENABLED", False)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0.5)
+    monkeypatch.setattr(profiling.random, "random", lambda: 0.7)
+    profiled(_allocating_handler)({}, MagicMock())
+    assert not list(output.iterdir())
+
+    monkeypatch.setattr(profiling.random, "random", lambda: 0.2)
+    profiled(_allocating_handler)({}, MagicMock())
+    assert len(list(output.glob("*.prof"))) == 1
+
+
+def test_handler_errors_propagate_and_are_profiled(output):
+    def failing(event, context):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        profiled(failing)({}, MagicMock())
+    assert len(list(output.glob("*.prof"))) == 1
+    assert not profiling._profiling.locked()
+
+
+def test_nested_invocations_are_not_profiled_twice(output):
+    inner = profiled(_allocating_handler)
+    profiled(lambda event, context: inner(event, context))({}, MagicMock())
+    assert len(list(output.glob("*.prof"))) == 1
+
+
+def test_write_failures_do_not_fail_the_request(output, monkeypatch):
+    monkeypatch.setattr(profiling, "_write", MagicMock(side_effect=OSError("read-only")))
+    assert profiled(_allocating_handler)({}, MagicMock())["statusCode"] == 200
+
+
+def test_writes_to_s3_prefix(mocked_s3, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILE_OUTPUT", "s3://test-image-bucket/debug/profiles")
+    monkeypatch.setattr(profiling, "_s3_client", mocked_s3)
+    profiled(_allocating_handler)({}, MagicMock(aws_request_id="req-2"))
+    keys = [o["Key"] for o in mocked_s3.list_objects_v2(Bucket="test-image-bucket")["Contents"]]
+    assert sorted(key.rsplit(".", 1)[-1] for key in keys) == ["prof", "txt"]
+    assert all(key.startswith("debug/profiles/test_profiling-") for key in keys)
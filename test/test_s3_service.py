@@ -87,4 +87,62 @@ def test_delete_file_s3_error(s3_service_instance):
         side_effect=ClientError({"Error": {"Code": "500", "Message": "S3 error"}}, "DeleteObject")
     )
     with pytest.raises(S3Error, match="Failed to delete"):
-        s3_service_instance.delete_file("fail.txt")
\ No newline at end of file
+        s3_service_instance.delete_file("fail.txt")
+
+def test_get_file_success(s3_service_instance):
+    s3_service_instance.upload_file(b"bytes", "get-me.jpg", "image/jpeg")
+    assert s3_service_instance.get_file("get-me.jpg") == b"bytes"
+
+
+def test_get_file_s3_error(s3_service_instance):
+    with pytest.raises(S3Error, match="Failed to download"):
+        s3_service_instance.get_file("missing.jpg")
+
+
+def test_head_file_success(s3_service_instance):
+    s3_service_instance.upload_file(b"12345", "head.png", "image/png")
+    assert s3_service_instance.head_file("head.png") == (5, "image/png")
+
+
+def test_head_file_s3_error(s3_service_instance):
+    with pytest.raises(S3Error, match="Failed to read attributes"):
+        s3_service_instance.head_file("missing.png")
+
+
+def test_iter_file_range_success(s3_service_instance):
+    s3_service_instance.upload_file(b"0123456789", "range.bin", "application/octet-stream")
+    chunks = list(s3_service_instance.iter_file_range("range.bin", 2, 7, chunk_size=4))
+    assert chunks == [b"2345", b"67"]
+
+
+def test_iter_file_range_s3_error(s3_service_instance):
+    with pytest.raises(S3Error, match="Failed to download"):
+        list(s3_service_instance.iter_file_range("missing.bin", 0, 1))
+
+
+def test_set_storage_class_keeps_metadata(s3_service_instance, mocked_s3):
+    mocked_s3.put_object(Bucket=s3_service_instance.bucket_name, Key="cold.jpg", Body=b"data", ContentType="image/jpeg")
+    s3_service_instance.set_storage_class("cold.jpg", "STANDARD_IA")
+    head = mocked_s3.head_object(Bucket=s3_service_instance.bucket_name, Key="cold.jpg")
+    assert head["StorageClass"] == "STANDARD_IA"
+    assert head["ContentType"] == "image/jpeg"
+    assert s3_service_instance.get_file("cold.jpg") == b"data"
+
+
+def test_set_storage_class_copies_large_objects_in_one_request(s3_service_instance, mocked_s3):
+    body = b"x" * (9 * 1024 * 1024)
+    mocked_s3.put_object(Bucket=s3_service_instance.bucket_name, Key="big.jpg", Body=body)
+    operations = []
+    s3_service_instance.s3_client.meta.events.register(
+        "before-call.s3", lambda model, **kwargs: operations.append(model.name)
+    )
+    s3_service_instance.set_storage_class("big.jpg", "STANDARD_IA")
+    assert "CopyObject" in operations
+    assert "CreateMultipartUpload" not in operations and "UploadPartCopy" not in operations
+    head = mocked_s3.head_object(Bucket=s3_service_instance.bucket_name, Key="big.jpg")
+    assert head["StorageClass"] == "STANDARD_IA" and head["ContentLength"] == len(body)
+
+
+def test_set_storage_class_missing_object(s3_service_instance):
+    with pytest.raises(S3Error, match="Failed to move missing.jpg to STANDARD_IA"):
+        s3_service_instance.set_storage_class("missing.jpg", "STANDARD_IA")
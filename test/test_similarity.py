@@ -0,0 +1,111 @@
+import pytest
+import random
+from io import BytesIO
+from PIL import Image
+from src.utils.image_hash import dhash, format_hash, parse_hash
+from src.utils.hamming_index import HammingIndex, popcount
+from src.exceptions import InvalidRequestError
+import numpy as np
+
+
+def _image_bytes(image, fmt="PNG"):
+    buffer = BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_dhash_is_stable_across_resize_and_format():
+    with open("imageFiles/image1.jpg", "rb") as f:
+        original = f.read()
+    with Image.open(BytesIO(original)) as image:
+        resized = _image_bytes(image.resize((image.width // 2, image.height // 2)))
+    distance = bin(dhash(original) ^ dhash(resized)).count("1")
+    assert distance <= 4
+
+
+def test_dhash_differs_between_images():
+    with open("imageFiles/image1.jpg", "rb") as f1, open("imageFiles/image3.png", "rb") as f3:
+        assert bin(dhash(f1.read()) ^ dhash(f3.read())).count("1") > 10
+
+
+def test_dhash_rejects_non_images():
+    with pytest.raises(InvalidRequestError, match="Cannot compute a perceptual hash"):
+        dhash(b"not an image")
+
+
+def test_hash_round_trip():
+    assert parse_hash(format_hash(0xABC)) == 0xABC
+    assert format_hash(1) == "0000000000000001"
+    with pytest.raises(InvalidRequestError):
+        parse_hash("xyz")
+
+
+def test_popcount():
+    values = np.array([0, 1, 0xFF, 2**64 - 1], dtype=np.uint64)
+    assert popcount(values).tolist() == [0, 1, 8, 64]
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 7, 12, 20])
+def test_index_matches_linear_scan(max_distance):
+    rng = random.Random(42)
+    index = HammingIndex()
+    hashes = {f"id{i}": rng.getrandbits(64) for i in range(2000)}
+    query = rng.getrandbits(64)
+    for i in range(50):
+        # Plant near neighbours at known distances.
+        value = query
+        for bit in rng.sample(range(64), i % 16):
+            value ^= 1 << bit
+        hashes[f"near{i}"] = value
+    for item_id, value in hashes.items():
+        index.add(item_id, value)
+
+    expected = sorted(
+        (item_id, bin(value ^ query).count("1"))
+        for item_id, value in hashes.items()
+        if bin(value ^ query).count("1") <= max_distance
+    )
+    assert sorted(index.search(query, max_distance)) == expected
+
+
+def test_index_replace_remove_and_limit():
+    index = HammingIndex()
+    index.add("a", 0b1111)
+    index.add("b", 0b0111)
+    index.add("c", 0b0011)
+    assert index.search(0, 4, limit=2) == [("c", 2), ("b", 3)]
+
+    index.add("a", 0)
+    index.remove("b")
+    index.add("d", 1)
+    index.remove("d")
+    assert len(index) == 2
+    assert index.search(0, 4) == [("a", 0), ("c", 2)]
+
+
+def test_index_from_arrays_matches_inserts():
+    rng = random.Random(7)
+    hashes = {f"id{i}": rng.getrandbits(64) for i in range(500)}
+    query = rng.getrandbits(64)
+    inserted = HammingIndex()
+    for item_id, value in hashes.items():
+        inserted.add(item_id, value)
+    bulk = HammingIndex.from_arrays(list(hashes), list(hashes.values()))
+    assert len(bulk) == 500
+    assert bulk.search(query, 30) == inserted.search(query, 30)
+
+    bulk.add("id0", query)
+    bulk.remove("id1")
+    assert bulk.search(query, 0) == [("id0", 0)]
+    assert len(bulk) == 499
+
+
+def test_snapshot_round_trip_and_validation():
+    from src.utils.hash_snapshot import pack_snapshot, unpack_snapshot
+    data = pack_snapshot(["a", "b"], [0, 2**64 - 1], 123)
+    ids, hashes, watermark = unpack_snapshot(data)
+    assert (ids, hashes.tolist(), watermark) == (["a", "b"], [0, 2**64 - 1], 123)
+    assert unpack_snapshot(pack_snapshot([], [], 5))[0] == []
+    for bad in [b"", b"XXXX" + data[4:], data[:-1 - len("a\nb")]]:
+        with pytest.raises(ValueError):
+            unpack_snapshot(bad)
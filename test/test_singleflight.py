@@ -0,0 +1,88 @@
+import threading
+import pytest
+from src.utils.singleflight import SingleFlight
+
+
+def _run_concurrently(flight, key, fn, callers, timeout=None):
+    results, errors = [None] * callers, [None] * callers
+
+    def call(i):
+        try:
+            results[i] = flight.do(key, fn, timeout=timeout)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def _wait_for_waiters(flight, key, count):
+    while flight._calls[key].waiters < count:
+        threading.Event().wait(0.001)
+
+
+def test_concurrent_callers_share_one_call():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"imageId": "1", "tags": ["a"]}
+
+    threads, results, errors = _run_concurrently(flight, "k", fetch, 8)
+    while not calls:
+        threading.Event().wait(0.001)
+    _wait_for_waiters(flight, "k", 7)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert errors == [None] * 8
+    assert all(result == {"imageId": "1", "tags": ["a"]} for result in results)
+    assert len({id(result) for result in results}) == 8
+    assert flight.in_flight() == 0
+
+
+def test_errors_propagate_to_waiters():
+    flight, release, started = SingleFlight(), threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    threads, _, errors = _run_concurrently(flight, "k", fail, 4)
+    started.wait(5)
+    _wait_for_waiters(flight, "k", 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert flight.in_flight() == 0
+
+
+def test_waiter_times_out():
+    flight, release, started = SingleFlight(), threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 1
+
+    leader = threading.Thread(target=flight.do, args=("k", slow))
+    leader.start()
+    started.wait(5)
+    with pytest.raises(TimeoutError):
+        flight.do("k", slow, timeout=0.01)
+    release.set()
+    leader.join()
+
+
+def test_sequential_calls_are_not_cached():
+    flight, values = SingleFlight(), iter([1, 2])
+    assert flight.do("k", lambda: next(values)) == 1
+    assert flight.do("k", lambda: next(values)) == 2
@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from src.handlers import tier_images
+from src.services.s3_service import S3Service
+from src.services.dynamodb_service import DynamoDBService
+
+DAY = 24 * 60 * 60
+NOW = 1700000000
+
+
+@pytest.fixture
+def services(mocked_s3, mocked_dynamodb, monkeypatch):
+    s3_service = S3Service(s3_client=mocked_s3)
+    dynamodb_service = DynamoDBService(dynamodb_resource=mocked_dynamodb)
+    monkeypatch.setattr('src.handlers.decorators._s3_service', s3_service)
+    monkeypatch.setattr('src.handlers.decorators._dynamodb_service', dynamodb_service)
+    return s3_service, dynamodb_service
+
+
+def _store(s3_service, dynamodb_service, image_id, size, **attributes):
+    key = f"{image_id}-photo.jpg"
+    s3_service.upload_file(b"x" * size, key, "image/jpeg")
+    dynamodb_service.put_item({"imageId": image_id, "s3_key": key, **attributes})
+    return key
+
+
+def _storage_class(s3_service, key):
+    head = s3_service.s3_client.head_object(Bucket=s3_service.bucket_name, Key=key)
+    return head.get("StorageClass", "STANDARD")
+
+
+@patch('src.handlers.tier_images.time.time', return_value=NOW)
+def test_moves_cold_originals_only(mock_time, services):
+    s3_service, dynamodb_service = services
+    big = 200 * 1024
+    cold = _store(s3_service, dynamodb_service, "cold", big, uploadTimestamp=NOW - 90 * DAY)
+    hot = _store(s3_service, dynamodb_service, "hot", big, uploadTimestamp=NOW - 90 * DAY, lastAccessed=NOW - DAY)
+    new = _store(s3_service, dynamodb_service, "new", big, uploadTimestamp=NOW - DAY)
+    small = _store(s3_service, dynamodb_service, "small", 1024, uploadTimestamp=NOW - 90 * DAY)
+
+    summary = tier_images.handler({}, MagicMock())
+
+    assert summary == {"candidates": 2, "tiered": 1, "kept": 1, "failed": 0}
+    assert _storage_class(s3_service, cold) == "STANDARD_IA"
+    assert _storage_class(s3_service, hot) == "STANDARD"
+    assert _storage_class(s3_service, new) == "STANDARD"
+    assert _storage_class(s3_service, small) == "STANDARD"
+    assert dynamodb_service.get_item("cold")["storageClass"] == "STANDARD_IA"
+    assert dynamodb_service.get_item("small")["storageClass"] == "STANDARD"
+
+    assert tier_images.handler({}, MagicMock())["candidates"] == 0
+
+
+@patch('src.handlers.tier_images.time.time', return_value=NOW)
+def test_failures_are_counted_and_retried_next_run(mock_time, services, monkeypatch):
+    s3_service, dynamodb_service = services
+    monkeypatch.setattr('src.handlers.tier_images.TIER_STORAGE_CLASS', "INTELLIGENT_TIERING")
+    dynamodb_service.put_item({"imageId": "orphan", "s3_key": "orphan-photo.jpg", "uploadTimestamp": NOW - 90 * DAY})
+    key = _store(s3_service, dynamodb_service, "cold", 200 * 1024, uploadTimestamp=NOW - 90 * DAY)
+
+    assert tier_images.handler({}, MagicMock()) == {"candidates": 2, "tiered": 1, "kept": 0, "failed": 1}
+    assert _storage_class(s3_service, key) == "INTELLIGENT_TIERING"
+    assert "storageClass" not in dynamodb_service.get_item("orphan")
+
+
+@patch('src.handlers.tier_images.time.time', return_value=NOW)
+def test_limits_objects_per_run(mock_time, services, monkeypatch):
+    s3_service, dynamodb_service = services
+    monkeypatch.setattr('src.handlers.tier_images.TIER_MAX_OBJECTS', 2)
+    for i in range(3):
+        _store(s3_service, dynamodb_service, f"cold{i}", 200 * 1024, uploadTimestamp=NOW - 90 * DAY)
+    assert tier_images.handler({}, MagicMock())["tiered"] == 2
+    assert tier_images.handler({}, MagicMock())["tiered"] == 1
+
+
+@patch('src.handlers.tier_images.time.time', return_value=NOW)
+def test_keeps_objects_too_large_for_a_single_copy(mock_time, services, monkeypatch):
+    s3_service, dynamodb_service = services
+    monkeypatch.setattr('src.handlers.tier_images.MAX_TIER_BYTES', 300 * 1024)
+    huge = _store(s3_service, dynamodb_service, "huge", 400 * 1024, uploadTimestamp=NOW - 90 * DAY)
+    assert tier_images.handler({}, MagicMock()) == {"candidates": 1, "tiered": 0, "kept": 1, "failed": 0}
+    assert _storage_class(s3_service, huge) == "STANDARD"